@@ -0,0 +1,98 @@
+# Approx-Validate: Validation of the Approximate Rankability Measure
+#
+# Compares specR_approx with the exact specR on every round of the CFB and
+# SinquefieldCup seasons, on synthetic large tournaments, on a league of tens
+# of thousands of teams, and on complete, directed cycle, and transitive
+# graphs, and reports the actual error, the reported error estimate and the
+# mean of its kernel, probe, and imaginary terms, and the run times. Every
+# block but the singletons is approximated (small=0), so that small graphs test
+# the approximation rather than the exact block solves; the CFB and
+# SinquefieldCup rounds still have fewer than 2k+2 such rows and are exact.
+from rankability import specR, specR_approx
+from pipeline import parse, play
+from gamelog import cfbPath, sqfieldPath
+from time import perf_counter
+from scipy import sparse
+import numpy as np
+
+###########################################################
+#                       datasets                          #
+###########################################################
+def cfbAdjs():
+    for conf,years in [('Atlantic Coast',range(1995,2004)),('Big East',range(1995,2013)),('Mountain West',range(1999,2012))]:
+        for year in years:
+            for a in play(parse('cfb',cfbPath(conf,year))):
+                yield a
+def sqfieldAdjs():
+    for year in range(2013,2020):
+        for a in play(parse('sqfield',sqfieldPath(year))):
+            yield a
+def syntheticAdjs(rng):
+    for n in [500,1000,2000]:
+        # round robin tournament won by the higher ranked team with probability p
+        for p in [0.5,0.8,0.95]:
+            win = rng.random((n,n))<p
+            a = np.triu(win,1) + np.triu(~win,1).T
+            yield 1.*a
+        # schedule of about 12 games per team
+        i = rng.integers(0,n,6*n); j = rng.integers(0,n,6*n)
+        a = sparse.csr_matrix((np.ones(len(i)),(i,j)),shape=(n,n))
+        a.setdiag(0); a.eliminate_zeros(); a.data[:] = 1.
+        yield a
+def leagueAdjs(rng):
+    # conferences of 50 teams play a round robin, and the teams of a conference
+    # beat those of every later one in 12 games per team: the strongly connected
+    # blocks are the conferences, so the exact measure is within reach
+    for n in [20000]:
+        c = 50
+        win = rng.random((n//c,c,c))<0.5
+        conf = np.arange(n)//c
+        i,j = np.nonzero(np.triu(np.ones((c,c),dtype=bool),1))
+        off = (np.arange(n//c)*c)[:,None]
+        w = win[:,i,j]
+        gi = np.r_[(off+i)[w],(off+j)[~w]]; gj = np.r_[(off+j)[w],(off+i)[~w]]
+        ci = rng.integers(0,n,6*n); cj = rng.integers(0,n,6*n)
+        cross = conf[ci]!=conf[cj]
+        ci,cj = np.minimum(ci,cj)[cross],np.maximum(ci,cj)[cross]
+        a = sparse.csr_matrix((np.ones(len(gi)+len(ci)),(np.r_[gi,ci],np.r_[gj,cj])),shape=(n,n))
+        a.data[:] = 1.
+        yield a
+def structuredAdjs(kind):
+    for n in [20,50,200,500]:
+        if(kind=='complete'):
+            # every team beats every other: eigenvalues 0 and n (n-1 times)
+            yield np.ones((n,n)) - np.eye(n)
+        elif(kind=='cycle'):
+            # team k beats team k+1 mod n: eigenvalues on a circle in the complex plane
+            yield sparse.csr_matrix((np.ones(n),(np.arange(n),(np.arange(n)+1)%n)),shape=(n,n))
+        else:
+            # transitive tournament: perfect dominance
+            yield np.triu(np.ones((n,n)),1)
+###########################################################
+#                       validate                          #
+###########################################################
+def validate(name,adjs):
+    err = []; bound = []; parts = []; te = 0.; ta = 0.
+    for a in adjs:
+        t = perf_counter(); r = specR(a); te = te + perf_counter() - t
+        t = perf_counter(); ra,eb,terms = specR_approx(a,small=0,seed=0); ta = ta + perf_counter() - t
+        err.append(abs(r-ra)); bound.append(eb); parts.append([terms['kernel'],terms['probe'],terms['imag']])
+    err = np.array(err); bound = np.array(bound); parts = np.mean(parts,axis=0)
+    # covered up to roundoff
+    print('%-15s %5d %10.2e %10.2e %10.2e %10.2e %10.2e %10.2e %10.2e %8.3f %10.2f %10.2f' % (name,len(err),np.amax(err),
+          np.mean(err),np.amax(bound),np.mean(bound),parts[0],parts[1],parts[2],np.mean(err<=bound+1e-12),te,ta))
+###########################################################
+#                       main                              #
+###########################################################
+def main():
+    print('%-15s %5s %10s %10s %10s %10s %10s %10s %10s %8s %10s %10s' % ('dataset','count','max err','mean err','max bound',
+          'mean bound','kernel','probe','imag','covered','exact (s)','approx (s)'))
+    validate('CFB',cfbAdjs())
+    validate('SinquefieldCup',sqfieldAdjs())
+    validate('synthetic',syntheticAdjs(np.random.default_rng(2019)))
+    validate('league',leagueAdjs(np.random.default_rng(2019)))
+    for kind in ['complete','cycle','transitive']:
+        validate(kind,structuredAdjs(kind))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+# Elo-Backtest: Grid Search of the CFB Elo Constants
+#
+# Backtests the Elo predictability (eloPred) of every combination of a grid of
+# K, X, and home advantage H over the seasons of a CFB conference. Each season
+# is parsed once (see pipeline.parse); the ratings of all (K, X) pairs are simulated together as a
+# stack of rating vectors, and eloPredGrid scores the whole stack against all
+# H values by broadcasting.
+#
+# Usage: python Elo-Backtest.py [CONFERENCE] [--first YEAR] [--last YEAR]
+from pipeline import parse
+from gamelog import cfbPath
+from elo import eloUpdate, eloPredGrid
+from sweep import driver
+from time import perf_counter
+import argparse
+import numpy as np
+
+###########################################################
+#                       backtest                          #
+###########################################################
+#   Elo predictability of a CFB season for every K, X, and
+#   H of the grids, as an array of shape (len(K), len(X),
+#   len(H)).
+###########################################################
+def backtest(conf,year,K,X,H):
+    season = parse('cfb',cfbPath(conf,year))
+    bounds = np.searchsorted(season.rnd,np.arange(season.numRounds+1))
+    # one rating vector per (K, X) pair
+    k,x = np.meshgrid(K,X,indexing='ij')
+    rating = np.zeros((k.size,season.n))
+    for r in range(season.numRounds):
+        g = slice(bounds[r],bounds[r+1])
+        eloUpdate(rating,season.i[g],season.j[g],season.s[g],k.reshape(-1,1),x.reshape(-1,1))
+    return eloPredGrid(season.games,rating,H).reshape(len(K),len(X),len(H))
+###########################################################
+#                       main                              #
+###########################################################
+def main():
+    mod = driver('CFB-Rank-EloCorr')
+    jobs = {conf: years for conf,years,opt in mod.JOBS}
+    parser = argparse.ArgumentParser(description='Grid search of the CFB Elo constants.')
+    parser.add_argument('conf',nargs='?',default='Big East',choices=list(jobs))
+    parser.add_argument('--first',type=int)
+    parser.add_argument('--last',type=int)
+    args = parser.parse_args()
+    years = [y for y in jobs[args.conf] if (args.first is None or y>=args.first) and (args.last is None or y<=args.last)]
+    # grids, including the driver's constants
+    K = np.unique(np.r_[np.linspace(4.,80.,20),mod.K])
+    X = np.unique(np.r_[np.geomspace(100.,4000.,20),mod.X])
+    H = np.unique(np.r_[np.linspace(0.,100.,26),mod.H])
+    t = perf_counter()
+    acc = np.mean([backtest(args.conf,year,K,X,H) for year in years],axis=0)
+    t = perf_counter() - t
+    print('%s %d-%d: %d combinations of K, X, and H over %d seasons in %.2f s' % (args.conf,years[0],years[-1],acc.size,len(years),t))
+    print('K, X, H, EloPred')
+    a,b,c = np.searchsorted(K,mod.K),np.searchsorted(X,mod.X),np.searchsorted(H,mod.H)
+    print('%.0f,%.0f,%.0f,%.4f (driver)' % (mod.K,mod.X,mod.H,acc[a,b,c]))
+    for f in np.argsort(-acc,axis=None,kind='stable')[:10]:
+        a,b,c = np.unravel_index(f,acc.shape)
+        print('%.0f,%.0f,%.0f,%.4f' % (K[a],X[b],H[c],acc[a,b,c]))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+# Hausdorff-Bench: Hausdorff Distance Benchmark
+#
+# Compares the nearest-point Hausdorff in rankability.py with the
+# original nested list comprehension for n from 10 to 10,000.
+from rankability import Hausdorff
+from time import perf_counter
+import numpy as np
+
+###########################################################
+#                    HausdorffBrute                       #
+###########################################################
+#   Original O(n^2) Hausdorff distance, kept as reference.
+###########################################################
+def HausdorffBrute(e,s):
+    # spectral variation
+    def _sv(e,s):
+        return max([min([abs(e[i]-s[j]) for j in range(len(s))]) for i in range(len(e))])
+    # Hausdorff distance
+    return max(_sv(e,s),_sv(s,e))
+###########################################################
+#                       bench                             #
+###########################################################
+#   Returns the best wall time over reps calls of f(e,s)
+#   and the computed distance.
+###########################################################
+def bench(f,e,s,reps):
+    best = np.inf
+    for r in range(reps):
+        t = perf_counter()
+        h = f(e,s)
+        best = min(best,perf_counter()-t)
+    return best, h
+###########################################################
+#                       main                              #
+###########################################################
+def main():
+    rng = np.random.default_rng(2019)
+    print('     n |  set  |   brute (s) |    fast (s) | speedup | diff')
+    for n in [10,30,100,300,1000,3000,10000]:
+        # perfect dominance spectrum, out-degree, and perturbed spectrum
+        s = np.array([n-k for k in range(1,n+1)])
+        x = 1.0*rng.integers(0,n,n)
+        e = s + rng.normal(0,1,n) + 1j*rng.normal(0,1,n)
+        reps = 3 if n<=1000 else 1
+        for name,v in [('x',x),('e',e)]:
+            tb,hb = bench(HausdorffBrute,v,s,reps)
+            tf,hf = bench(Hausdorff,v,s,max(reps,10))
+            print('%6d | %5s | %11.6f | %11.6f | %7.1f | %.1e' % (n,name,tb,tf,tb/tf,abs(hb-hf)))
+
+if __name__ == '__main__':
+    main()
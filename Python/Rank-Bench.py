@@ -0,0 +1,223 @@
+# Rank-Bench: Rankability Benchmark and Regression Suite
+#
+# Times specR, Hausdorff, and edgeR across n, and the cfbData and sqfieldData
+# season analyses end to end, recording the wall time, peak memory, and
+# eigensolver time of each case in a JSON results file. The results are
+# compared with a stored baseline, and the round by round and summary CSVs are
+# recomputed, by the default path, with compact round histories, and with the
+# specR cache, and checked against the ones in DataFiles/PythonResults.
+#
+# Usage: python Rank-Bench.py [--baseline FILE] [--threshold 0.25] [--out FILE]
+import os
+import io
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import tracemalloc
+import contextlib
+from time import perf_counter
+import numpy as np
+import scipy
+from scipy import sparse
+import rankability
+from rankability import specR, Hausdorff, edgeR
+from gamelog import cfbGames
+from sweep import driver, cfbSweep, sqfieldSweep, RESULTS
+
+###########################################################
+#                       eigTimer                          #
+###########################################################
+#   Adds the time spent in the dense (LAPACK) and sparse
+#   (ARPACK) eigensolvers used by rankability to timer[0]
+#   while in the with block.
+###########################################################
+@contextlib.contextmanager
+def eigTimer(timer):
+    def timed(f):
+        def g(*args,**kwargs):
+            t = perf_counter()
+            try:
+                return f(*args,**kwargs)
+            finally:
+                timer[0] = timer[0] + perf_counter() - t
+        return g
+    saved = (np.linalg.eigvals,rankability.eigs,rankability.eigsh)
+    np.linalg.eigvals = timed(saved[0])
+    rankability.eigs = timed(saved[1])
+    rankability.eigsh = timed(saved[2])
+    try:
+        yield timer
+    finally:
+        np.linalg.eigvals,rankability.eigs,rankability.eigsh = saved
+###########################################################
+#                       measure                           #
+###########################################################
+#   Best wall time and its eigensolver time over at least
+#   reps calls of f(*args) (more while under budget
+#   seconds), and the peak traced memory of one more call.
+###########################################################
+def measure(f,args,reps=3,budget=0.5):
+    best = np.inf; eig = 0.; total = 0.; r = 0
+    while(r<reps or (total<budget and r<100)):
+        timer = [0.]
+        with eigTimer(timer):
+            t = perf_counter()
+            f(*args)
+            t = perf_counter() - t
+        if(t<best):
+            best = t; eig = timer[0]
+        total = total + t; r = r + 1
+    tracemalloc.start()
+    f(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {'wall': best, 'eig': eig, 'peak': peak, 'reps': r}
+###########################################################
+#                       cases                             #
+###########################################################
+#   (name, f, args, reps) of every benchmark case.
+###########################################################
+def tournament(rng,n,p=0.8):
+    # round robin won by the higher ranked team with probability p
+    win = rng.random((n,n))<p
+    return 1.*(np.triu(win,1) + np.triu(~win,1).T)
+def schedule(rng,n,games=12):
+    # about games games per team
+    i = rng.integers(0,n,games*n//2); j = rng.integers(0,n,games*n//2)
+    a = sparse.csr_matrix((np.ones(len(i)),(i,j)),shape=(n,n))
+    a.setdiag(0); a.eliminate_zeros(); a.data[:] = 1.
+    return a
+def cases(rng,quick=False):
+    n = [10,30,100,300] if quick else [10,30,100,300,1000]
+    for k in [6,30,100]:
+        complete = np.ones((k,k)) - np.eye(k)
+        yield 'specR/complete/%d' % k, specR, (complete,), 3
+        yield 'specR/empty/%d' % k, specR, (np.zeros((k,k)),), 3
+    for k in n:
+        yield 'specR/tournament/%d' % k, specR, (tournament(rng,k),), 3
+    for k in [300,1000] if quick else [300,1000,3000]:
+        yield 'specR/schedule/%d' % k, specR, (schedule(rng,k),), 1
+    for k in n + ([] if quick else [3000,10000]):
+        s = np.arange(k-1,-1,-1.)
+        yield 'Hausdorff/real/%d' % k, Hausdorff, (1.*rng.integers(0,k,k),s), 3
+        yield 'Hausdorff/complex/%d' % k, Hausdorff, (s+rng.normal(0,1,k)+1j*rng.normal(0,1,k),s), 3
+    for k in [6,8,10,12] if quick else [6,8,10,12,14,16]:
+        yield 'edgeR/tournament/%d' % k, edgeR, (tournament(rng,k),), 3
+    cfb = driver('CFB-Rank-EloCorr')
+    for conf,years,opt in cfb.JOBS:
+        for year in list(years)[:1] if quick else years:
+            yield 'cfbData/%s/%d' % (conf,year), cfb.cfbData, (conf,year,opt), 1
+    sqfield = driver('SQField-Rank-EloCorr')
+    for year in list(sqfield.YEARS)[:1] if quick else sqfield.YEARS:
+        yield 'sqfieldData/%d' % year, sqfield.sqfieldData, (year,"SR"), 1
+###########################################################
+#                       compare                           #
+###########################################################
+#   Cases whose wall time is more than threshold (relative)
+#   and floor seconds above the baseline.
+###########################################################
+def compare(results,baseline,threshold,floor=1e-3):
+    slow = []
+    for name,r in results.items():
+        b = baseline.get(name)
+        if(b is not None and r['wall']>b['wall']*(1+threshold) and r['wall']-b['wall']>floor):
+            slow.append((name,b['wall'],r['wall']))
+    return slow
+###########################################################
+#                       check                             #
+###########################################################
+#   Recomputes the driver CSVs in a temporary directory
+#   by the default path, with compact round histories,
+#   and with the specR cache enabled on disk, first empty
+#   and then read back, and returns the largest absolute
+#   difference of each with the stored one (inf if their
+#   shapes differ), keyed by variant/file.
+###########################################################
+def check():
+    cfb = driver('CFB-Rank-EloCorr')
+    sqfield = driver('SQField-Rank-EloCorr')
+    diff = {}
+    saved = rankability.cache
+    with tempfile.TemporaryDirectory() as tmp:
+        store = os.path.join(tmp,'specRCache')
+        try:
+            for variant,compact,cached in [('default',False,False),('compact',True,False),('cache',False,True),
+                                           ('cache-disk',False,True)]:
+                # a new cache starts from the entries on disk only
+                rankability.specRCache(path=store) if cached else rankability.specRCache(0)
+                out = lambda name: os.path.join(tmp,variant+'-'+name)
+                with contextlib.redirect_stdout(io.StringIO()):
+                    cfbSweep(cfb.JOBS,1,out('CFB-Rank-EloCorr-Rounds.csv'),out('CFB-Rank-EloCorr-Summary.csv'),compact=compact)
+                    sqfieldSweep(sqfield.YEARS,"SR",1,out('SQField-Rank-EloCorr-Rounds.csv'),out('SQField-Rank-EloCorr-Summary.csv'),
+                                 compact=compact)
+                for name in ['CFB-Rank-EloCorr-Rounds.csv','CFB-Rank-EloCorr-Summary.csv','SQField-Rank-EloCorr-Rounds.csv',
+                             'SQField-Rank-EloCorr-Summary.csv']:
+                    diff[variant+'/'+name] = csvDiff(os.path.join(RESULTS,name),out(name))
+        finally:
+            rankability.cache = saved
+    return diff
+def csvDiff(path1,path2):
+    with open(path1) as f1, open(path2) as f2:
+        rows1 = f1.read().splitlines(); rows2 = f2.read().splitlines()
+    if(len(rows1)!=len(rows2)):
+        return np.inf
+    d = 0.
+    for r1,r2 in zip(rows1,rows2):
+        if(r1==r2):
+            continue
+        c1 = r1.split(','); c2 = r2.split(',')
+        if(len(c1)!=len(c2)):
+            return np.inf
+        for t1,t2 in zip(c1,c2):
+            try:
+                d = max(d,abs(float(t1)-float(t2)))
+            except ValueError:
+                if(t1!=t2):
+                    return np.inf
+    return d
+###########################################################
+#                       main                              #
+###########################################################
+def main():
+    parser = argparse.ArgumentParser(description='Rankability benchmark and regression suite.')
+    parser.add_argument('--out',default=os.path.join(RESULTS,'Rank-Bench.json'),help='results JSON file')
+    parser.add_argument('--baseline',help='baseline results JSON file to compare with')
+    parser.add_argument('--threshold',type=float,default=0.25,help='relative slowdown counted as a regression')
+    parser.add_argument('--tol',type=float,default=0.,help='largest allowed difference with the stored CSVs')
+    parser.add_argument('--quick',action='store_true',help='smaller n and one season per dataset')
+    parser.add_argument('--no-check',dest='check',action='store_false',help='skip the CSV check')
+    args = parser.parse_args()
+    rng = np.random.default_rng(2019)
+    # warm up the game caches so the first season is not charged for parsing
+    cfbGames('Atlantic Coast',1995)
+    results = {}
+    print('%-32s %11s %11s %11s %6s' % ('case','wall (s)','eig (s)','peak (MB)','reps'))
+    for name,f,fargs,reps in cases(rng,args.quick):
+        r = results[name] = measure(f,fargs,reps)
+        print('%-32s %11.6f %11.6f %11.3f %6d' % (name,r['wall'],r['eig'],r['peak']/2**20,r['reps']),flush=True)
+    failed = False
+    # numerical check of the driver outputs
+    diff = check() if args.check else {}
+    for name,d in diff.items():
+        print('%-44s max diff = %.1e' % (name,d))
+        failed = failed or not d<=args.tol
+    # regressions against the baseline
+    if(args.baseline):
+        with open(args.baseline) as f:
+            slow = compare(results,json.load(f)['cases'],args.threshold)
+        print('%d regressions over %.0f%%' % (len(slow),100*args.threshold))
+        for name,b,r in slow:
+            print('\t%-32s %11.6f -> %11.6f (%+.0f%%)' % (name,b,r,100*(r/b-1)))
+        failed = failed or len(slow)>0
+    # results file
+    meta = {'date': time.strftime('%Y-%m-%dT%H:%M:%S'),'python': platform.python_version(),'numpy': np.__version__,
+            'scipy': scipy.__version__,'machine': platform.machine(),'cpus': os.cpu_count()}
+    with open(args.out,'w') as f:
+        json.dump({'meta': meta,'cases': results,'check': diff},f,indent=1)
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+# Elo Module
+#
+# This module simulates the Elo ratings of a season and measures their round to
+# round correlation.
+# The games of a round are processed as arrays; a team that plays more than
+# once in a round has its games applied in order, so the ratings are the same
+# as those of a game by game simulation.
+import numpy as np
+from scipy.stats import rankdata
+import instrument
+###############################################
+###             eloUpdate                   ###
+###############################################
+#   Updates rating in place with the games of a
+#   round, where team i[g] scored s[g] (1 win,
+#   0.5 tie, 0 loss) against team j[g]. rating
+#   may be a stack of rating vectors (... x n),
+#   with K and X broadcast against it (e.g. of
+#   shape (P,1) for P rating vectors).
+###############################################
+def eloUpdate(rating,i,j,s,K,X):
+    # winner w and loser l (team i for a tie) and score of w
+    w = np.where(s<0.5,j,i)
+    l = np.where(s<0.5,i,j)
+    s = np.maximum(s,1.-s)
+    # split games into waves in which each team plays at most once
+    wave = np.zeros(len(s),dtype=int)
+    last = {}
+    for g in range(len(s)):
+        wave[g] = max(last.get(w[g],-1),last.get(l[g],-1)) + 1
+        last[w[g]] = wave[g]
+        last[l[g]] = wave[g]
+    for v in range(wave.max()+1 if len(s) else 0):
+        g = wave==v
+        d = rating[...,w[g]] - rating[...,l[g]]
+        u = 1./(1.+10.**(-d/X))
+        rating[...,w[g]] = rating[...,w[g]] + K*(s[g]-u)
+        rating[...,l[g]] = rating[...,l[g]] + K*(u-s[g])
+    return rating
+###############################################
+###             eloHistory                  ###
+###############################################
+#   Elo ratings of n teams after each of the
+#   numRounds rounds, where game g is played in
+#   round rnd[g] (nondecreasing).
+###############################################
+def eloHistory(i,j,s,rnd,numRounds,n,K,X):
+    history = np.zeros((numRounds,n))
+    rating = np.zeros(n)
+    bounds = np.searchsorted(rnd,np.arange(numRounds+1))
+    for k in range(numRounds):
+        g = slice(bounds[k],bounds[k+1])
+        instrument.atRound(k)
+        with instrument.phase('elo'):
+            history[k] = eloUpdate(rating,i[g],j[g],s[g],K,X)
+    instrument.atRound(None)
+    return history
+###############################################
+###             eloCorr                     ###
+###############################################
+#   Spearman (SR), Kendall tau-b (KT), and
+#   Pearson (PR) correlation of each round's
+#   ratings with the previous round's ratings,
+#   as in scipy.stats; nan for constant ratings.
+#   Only the types in opts are computed.
+###############################################
+def eloCorr(history,opts=("SR","KT","PR")):
+    a = history[1:]
+    b = history[:-1]
+    corr = {}
+    with np.errstate(divide='ignore',invalid='ignore'):
+        # Spearman
+        if("SR" in opts):
+            corr["SR"] = _pearson(rankdata(a,axis=1),rankdata(b,axis=1))
+        # Kendall tau-b
+        if("KT" in opts):
+            kt = np.zeros(len(a))
+            for k in range(len(a)):
+                sa = np.sign(a[k][:,None]-a[k][None,:])
+                sb = np.sign(b[k][:,None]-b[k][None,:])
+                kt[k] = np.sum(sa*sb)/np.sqrt(np.sum(np.abs(sa))*np.sum(np.abs(sb)))
+            corr["KT"] = np.clip(kt,-1.,1.)
+        # Pearson
+        if("PR" in opts):
+            corr["PR"] = _pearson(a,b)
+    return corr
+###############################################
+###             eloPred                     ###
+###############################################
+#   Fraction of the CFB games (gamelog.CFB
+#   array) whose winner is rated above the loser
+#   by rating, where a home team has advantage H
+#   (as eloPred in CFB-Rank-EloCorr). A tie is
+#   scored as a win for team j; a neutral site
+#   game is never counted as predicted.
+###############################################
+def eloPred(games,rating,H):
+    return float(eloPredGrid(games,rating,H))
+###############################################
+###             eloPredGrid                 ###
+###############################################
+#   eloPred of every rating vector of a stack
+#   ratings (... x n) for every home advantage
+#   of an array H, by broadcasting. Returns an
+#   array of shape ratings.shape[:-1]+H.shape.
+###############################################
+def eloPredGrid(games,ratings,H):
+    ratings = np.asarray(ratings,dtype=float)
+    H = np.asarray(H,dtype=float)
+    # (..., 1 x len(H), games)
+    ri = ratings[...,games['teami']-1].reshape(ratings.shape[:-1]+(1,)*H.ndim+(len(games),))
+    rj = ratings[...,games['teamj']-1].reshape(ri.shape)
+    h = H[...,None]
+    homei = games['homei']; homej = games['homej']
+    # team i won at home or on the road
+    pi = ((homei==1)&(ri>rj-h)) | ((homei==-1)&(ri>rj+h))
+    # team j won at home or on the road
+    pj = ((homej==1)&(rj>ri-h)) | ((homej==-1)&(rj>ri+h))
+    # ties are scored as wins for team j
+    correct = np.where(games['scorei']>games['scorej'],pi,pj)
+    return np.count_nonzero(correct,axis=-1)/float(len(games))
+def _pearson(a,b):
+    a = a - np.mean(a,axis=1,keepdims=True)
+    b = b - np.mean(b,axis=1,keepdims=True)
+    r = np.sum(a*b,axis=1)/np.sqrt(np.sum(a*a,axis=1)*np.sum(b*b,axis=1))
+    return np.clip(r,-1.,1.)
@@ -0,0 +1,100 @@
+# Game Log Module
+#
+# This module reads the game files in the DataFiles directory into typed NumPy
+# structured arrays, parsing each file in one vectorized pass.
+# The parsed array is cached as a .npy file next to the source file, so later
+# runs load it memory-mapped; a cache older than its source file is rebuilt.
+import os
+import numpy as np
+
+# DataFiles directory
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)),'..','DataFiles')
+
+# CFB games: serial day, date (yyyymmdd), and team, home (1 home, -1 away,
+# 0 neutral), and score of both teams
+CFB = np.dtype([('day','i4'),('date','i4'),('teami','i4'),('homei','i4'),('scorei','i4'),
+                ('teamj','i4'),('homej','i4'),('scorej','i4')])
+# SinquefieldCup games: player and score of both players
+SQFIELD = np.dtype([('playeri','i4'),('scorei','f8'),('scorej','f8'),('playerj','i4')])
+###############################################
+###             readCFB                     ###
+###############################################
+#   Parses a CFB games file.
+###############################################
+def readCFB(path):
+    return np.loadtxt(path,delimiter=',',dtype=CFB,ndmin=1)
+###############################################
+###             readSQField                 ###
+###############################################
+#   Parses the games of a SinquefieldCup file,
+#   whose results read "1 - 0", "0 - 1", or
+#   "1/2 - 1/2".
+###############################################
+def readSQField(path):
+    rows = np.loadtxt(path,delimiter=',',dtype=str,skiprows=1,ndmin=2)
+    games = np.zeros(len(rows),dtype=SQFIELD)
+    games['playeri'] = rows[:,0].astype(int)
+    games['playerj'] = rows[:,2].astype(int)
+    # parse each distinct result once
+    result,inv = np.unique(rows[:,1],return_inverse=True)
+    score = np.array([[parseScore(t) for t in r.split('-')] for r in result]).reshape(-1,2)
+    games['scorei'] = score[inv.ravel(),0]
+    games['scorej'] = score[inv.ravel(),1]
+    return games
+###############################################
+###             parseScore                  ###
+###############################################
+#   Parses a score "1", "0", or "1/2".
+###############################################
+def parseScore(t):
+    num,sep,den = t.strip().partition('/')
+    return float(num)/float(den) if sep else float(num)
+###############################################
+###             load                        ###
+###############################################
+#   Returns the games parsed from path by read,
+#   memory-mapped from the .npy cache when it is
+#   at least as new as path. The cache is skipped
+#   if it cannot be written.
+###############################################
+def load(path,read):
+    cache = os.path.splitext(path)[0] + '.npy'
+    if(os.path.exists(cache) and os.path.getmtime(cache)>=os.path.getmtime(path)):
+        return np.load(cache,mmap_mode='r')
+    games = read(path)
+    try:
+        tmp = cache + '.%d.tmp' % os.getpid()
+        with open(tmp,'wb') as f:
+            np.save(f,games)
+        os.replace(tmp,cache)
+    except OSError:
+        pass
+    return games
+###############################################
+###             cfbPath and sqfieldPath     ###
+###############################################
+#   Games file of a CFB conference and year and
+#   of a SinquefieldCup year.
+###############################################
+def cfbPath(conf,year):
+    return os.path.join(DATA,'CFB',str(conf),str(year)+'games.txt')
+def sqfieldPath(year):
+    return os.path.join(DATA,'SinquefieldCup','SinquefieldCup'+str(year)+'.csv')
+###############################################
+###             cfbGames                    ###
+###############################################
+#   Games of a CFB conference and year.
+###############################################
+def cfbGames(conf,year):
+    return load(cfbPath(conf,year),readCFB)
+###############################################
+###             sqfieldGames                ###
+###############################################
+#   Number of players, number of rounds, and
+#   games of a SinquefieldCup year.
+###############################################
+def sqfieldGames(year):
+    path = sqfieldPath(year)
+    with open(path) as f:
+        row = f.readline().split(',')
+    return int(row[0]), int(row[1]), load(path,readSQField)
@@ -0,0 +1,149 @@
+# Instrument Module
+#
+# This module keeps opt-in timers and counters for the phases of a season
+# analysis (parsing, playing rounds, eigensolves, Hausdorff distances, Elo
+# updates, correlations, ...), in total and per round.
+# Instrumentation is enabled by setting the environment variable SPECR_PROFILE
+# (to anything but 0) or inside a with profile() block. When it is disabled,
+# phase returns a shared no-op context and add returns at once, so the
+# instrumented code pays one function call per phase.
+import os
+import csv
+import json
+import time
+import contextlib
+from time import perf_counter
+
+# instrumentation switch
+ENABLED = os.environ.get('SPECR_PROFILE','0') not in ('','0')
+# (run, round, phase) -> {metric: value}
+_stats = {}
+# current run label and round
+_run = ''
+_round = None
+_NULL = contextlib.nullcontext()
+###############################################
+###             add                         ###
+###############################################
+#   Adds v to metric of phase in the current
+#   run and round.
+###############################################
+def add(phase,metric,v=1):
+    if(not ENABLED):
+        return
+    d = _stats.setdefault((_run,_round,phase),{})
+    d[metric] = d.get(metric,0) + v
+###############################################
+###             phase                       ###
+###############################################
+#   Context that adds its wall time and one call
+#   to phase.
+###############################################
+class _Timer:
+    __slots__ = ('phase','t')
+    def __init__(self,phase):
+        self.phase = phase
+    def __enter__(self):
+        self.t = perf_counter()
+        return self
+    def __exit__(self,*exc):
+        add(self.phase,'time',perf_counter()-self.t)
+        add(self.phase,'calls')
+        return False
+def phase(name):
+    if(not ENABLED):
+        return _NULL
+    return _Timer(name)
+###############################################
+###             atRound                     ###
+###############################################
+#   Charges the following phases to round k (to
+#   the whole run if k is None).
+###############################################
+def atRound(k):
+    global _round
+    if(ENABLED):
+        _round = k
+###############################################
+###             run                         ###
+###############################################
+#   Charges the phases of the with block to the
+#   run label, e.g. 'Big East/2004'.
+###############################################
+@contextlib.contextmanager
+def run(label):
+    global _run,_round
+    if(not ENABLED):
+        yield
+        return
+    saved = (_run,_round)
+    _run,_round = label,None
+    try:
+        with _Timer('total'):
+            yield
+    finally:
+        _run,_round = saved
+###############################################
+###             profile                     ###
+###############################################
+#   Enables instrumentation in the with block,
+#   starting from empty statistics.
+###############################################
+@contextlib.contextmanager
+def profile():
+    global ENABLED
+    saved = ENABLED
+    ENABLED = True
+    _stats.clear()
+    try:
+        yield
+    finally:
+        ENABLED = saved
+###############################################
+###             take and merge              ###
+###############################################
+#   take removes and returns the statistics as
+#   rows (run, round, phase, metric, value), and
+#   merge adds such rows, e.g. from a worker
+#   process.
+###############################################
+def take():
+    rows = [(r,k,p,m,v) for (r,k,p),d in _stats.items() for m,v in d.items()]
+    _stats.clear()
+    return rows
+def merge(rows):
+    for r,k,p,m,v in rows:
+        d = _stats.setdefault((r,k,p),{})
+        d[m] = d.get(m,0) + v
+###############################################
+###             report                      ###
+###############################################
+#   The statistics by run, with the totals of
+#   each phase and the phases of each round.
+###############################################
+def report():
+    runs = {}
+    for (r,k,p),d in sorted(_stats.items(),key=lambda t: (t[0][0],-1 if t[0][1] is None else t[0][1],t[0][2])):
+        run = runs.setdefault(r,{'total': {},'rounds': {}})
+        total = run['total'].setdefault(p,{})
+        for m,v in d.items():
+            total[m] = total.get(m,0) + v
+        if(k is not None):
+            run['rounds'].setdefault(str(k+1),{})[p] = dict(d)
+    return runs
+###############################################
+###             export                      ###
+###############################################
+#   Writes the report to base.json and its rows
+#   to base.csv (rounds counted from 1, blank
+#   for the whole run).
+###############################################
+def export(base):
+    with open(base+'.json','w') as f:
+        json.dump({'date': time.strftime('%Y-%m-%dT%H:%M:%S'),'runs': report()},f,indent=1)
+    with open(base+'.csv','w',newline='') as f:
+        w = csv.writer(f)
+        w.writerow(['Run','Round','Phase','Metric','Value'])
+        for (r,k,p),d in sorted(_stats.items(),key=lambda t: (t[0][0],-1 if t[0][1] is None else t[0][1],t[0][2])):
+            for m,v in d.items():
+                w.writerow([r,'' if k is None else k+1,p,m,v])
@@ -0,0 +1,149 @@
+# Pipeline Module
+#
+# This module holds the stages of a season analysis shared by the drivers,
+# specr, whatif, Elo-Backtest, and Approx-Validate: the datasets found under
+# DataFiles (discover), the games of a season split into rounds (parse), the
+# adjacency matrix of each round and the Elo ratings after it (play and
+# simulate), and the rankability and Elo correlation of each round (score).
+import os
+import re
+from collections import namedtuple
+import numpy as np
+from rankability import specR, specR_batch, SpecTracker
+from tournament import Tournament, RoundHistory
+from gamelog import DATA, load, readCFB, readSQField
+from elo import eloHistory, eloCorr, eloPred
+import instrument
+
+# A dataset of kind 'cfb' or 'sqfield' with the games file of each year
+Dataset = namedtuple('Dataset',['name','kind','paths'])
+# The games of a season: team i[g] scored s[g] against team j[g] in round
+# rnd[g] of numRounds, between n teams; games is the parsed games array
+Season = namedtuple('Season',['i','j','s','rnd','numRounds','n','games'])
+###############################################
+###             discover                    ###
+###############################################
+#   Datasets under the data directory, by name.
+###############################################
+def discover(data=DATA):
+    datasets = {}
+    cfb = os.path.join(data,'CFB')
+    for conf in sorted(os.listdir(cfb)) if os.path.isdir(cfb) else []:
+        paths = _years(os.path.join(cfb,conf),r'(\d{4})games\.txt')
+        if(paths):
+            datasets['CFB/'+conf] = Dataset('CFB/'+conf,'cfb',paths)
+    paths = _years(os.path.join(data,'SinquefieldCup'),r'SinquefieldCup(\d{4})\.csv')
+    if(paths):
+        datasets['SinquefieldCup'] = Dataset('SinquefieldCup','sqfield',paths)
+    return datasets
+def _years(path,pattern):
+    if(not os.path.isdir(path)):
+        return {}
+    paths = {}
+    for f in os.listdir(path):
+        m = re.fullmatch(pattern,f)
+        if(m):
+            paths[int(m.group(1))] = os.path.join(path,f)
+    return dict(sorted(paths.items()))
+###############################################
+###             parse                       ###
+###############################################
+#   The Season of a CFB or SinquefieldCup games
+#   file, split into rounds as in the drivers.
+###############################################
+def parse(kind,path):
+    if(kind=='cfb'):
+        games = load(path,readCFB)
+        i = games['teami'] - 1; j = games['teamj'] - 1
+        s = 0.5 + 0.5*np.sign(games['scorei'] - games['scorej'])
+        rnd = rounds(games['day'])
+        return Season(i,j,s,rnd,rnd[-1]+1,int(max(np.amax(i),np.amax(j)))+1,games)
+    with open(path) as f:
+        row = f.readline().split(',')
+    n,numRounds = int(row[0]),int(row[1])
+    games = load(path,readSQField)[:numRounds*(n//2)]
+    i = games['playeri'] - 1; j = games['playerj'] - 1
+    s = 0.5 + 0.5*np.sign(games['scorei'] - games['scorej'])
+    # n//2 games are played each round
+    rnd = np.repeat(np.arange(numRounds),n//2)
+    return Season(i,j,s,rnd,numRounds,n,games)
+###############################################
+###             rounds                      ###
+###############################################
+#   Round of each of a season's CFB games from
+#   their days, in order.
+###############################################
+def rounds(day):
+    # a new round starts after a gap of more than 4 days
+    return np.r_[0,np.cumsum((np.diff(day)+1)>4)]
+###############################################
+###             play                        ###
+###############################################
+#   Adjacency matrix of each round of a Season,
+#   as a list or, if compact, a RoundHistory.
+#   If warm, no round is kept: each is scored
+#   as it closes, from the Tournament's graph
+#   Laplacian, with one SpecTracker that reuses
+#   the eigenvalues of the parts of the
+#   dominance graph the round left unchanged,
+#   and the rankability of each round is
+#   returned instead (equal to the stacked solve
+#   to roundoff, not bitwise). Memory then stays
+#   flat across the season.
+###############################################
+def play(season,compact=False,warm=False):
+    tour = Tournament(season.n,history=not warm,compact=compact)
+    tracker = SpecTracker() if warm else None
+    rankability = []
+    bounds = np.searchsorted(season.rnd,np.arange(season.numRounds+1))
+    for k in range(season.numRounds):
+        instrument.atRound(k)
+        with instrument.phase('play'):
+            for g in range(bounds[k],bounds[k+1]):
+                tour.play(season.i[g],season.j[g],season.s[g])
+            # close round
+            tour.endRound()
+        if(warm):
+            rankability.append(specR(tour.adj,tracker=tracker,lap=tour.lap))
+    instrument.atRound(None)
+    return rankability if warm else tour.adjs
+###############################################
+###             simulate                    ###
+###############################################
+#   Adjacency matrix (or, if warm, rankability)
+#   of each round (see play) and Elo ratings
+#   after each round of a Season.
+###############################################
+def simulate(season,K,X,compact=False,warm=False):
+    adjs = play(season,compact,warm)
+    history = eloHistory(season.i,season.j,season.s,season.rnd,season.numRounds,season.n,K,X)
+    return adjs, history
+###############################################
+###             score                       ###
+###############################################
+#   Rankability of each round, Elo correlation
+#   of each round with the previous one for each
+#   type in corr, and, for CFB and unless H is
+#   None, the fraction of games predicted by the
+#   final ratings with home advantage H (as
+#   eloPred in the CFB driver). The rounds of a
+#   RoundHistory are scored 64 at a time. If
+#   warm, adjs holds the rankability of each
+#   round, as scored by play.
+###############################################
+def score(kind,season,adjs,history,corr,H=None,warm=False):
+    if(warm):
+        rankability = adjs
+    elif(type(adjs) is RoundHistory):
+        rankability = [r for a in adjs.chunks(64) for r in specR_batch(a)]
+    else:
+        rankability = specR_batch(adjs)
+    with instrument.phase('corr'):
+        elo_corr = eloCorr(history,corr)
+    elo_pred = None
+    if(kind=='cfb' and H is not None):
+        with instrument.phase('eloPred'):
+            elo_pred = eloPred(season.games,history[-1],H)
+    return {'rankability': [float(r) for r in rankability],
+            'elo_corr': {opt: [float(c) for c in elo_corr[opt]] for opt in corr},
+            'elo_pred': elo_pred}
@@ -8,10 +8,42 @@
 #
 # Author: Thomas R. Cameron
 # Date: 11/1/2019
+import os
+import hashlib
 import numpy as np
 import itertools
-from math import factorial
+from collections import OrderedDict, namedtuple
+from math import factorial, lgamma, log, exp, sqrt
+from concurrent.futures import ProcessPoolExecutor
+from scipy import sparse
+from scipy.sparse.csgraph import connected_components
+from scipy.sparse.linalg import eigs, eigsh, ArpackError, ArpackNoConvergence
+from scipy.spatial import cKDTree
 from scipy.stats import spearmanr
+import instrument
+###############################################
+###             nearest                     ###
+###############################################
+#   Distance from each point of e to the nearest
+#   point of s: a sorted binary search when s is
+#   real (exact), a kd-tree query when it is not
+#   (the distance to the point found is taken as
+#   abs(e-s), as in the brute force search).
+###############################################
+def nearest(e,s):
+    e = np.asarray(e).ravel()
+    s = np.asarray(s).ravel()
+    if(np.iscomplexobj(s) and np.any(s.imag)):
+        # nearest point of s in the complex plane
+        t = cKDTree(np.column_stack((s.real,s.imag)))
+        dist,idx = t.query(np.column_stack((e.real,e.imag)))
+        return np.abs(e-s[idx])
+    # nearest point of s on the real line
+    s = np.sort(s.real)
+    k = np.searchsorted(s,e.real)
+    lo = s[np.clip(k-1,0,len(s)-1)]
+    hi = s[np.clip(k,0,len(s)-1)]
+    return np.minimum(np.abs(e-lo),np.abs(e-hi))
 ###############################################
 ###             Hausdorff                   ###
 ###############################################
@@ -20,32 +52,710 @@ from scipy.stats import spearmanr
 def Hausdorff(e,s):
     # spectral variation
     def _sv(e,s):
-        return max([min([abs(e[i]-s[j]) for j in range(len(s))]) for i in range(len(e))])
+        return np.amax(nearest(e,s))
     # Hausdorff distance
     return max(_sv(e,s),_sv(s,e))
 ###############################################
+###             Hausdorff_batch             ###
+###############################################
+#   Hausdorff distance between each row of e and
+#   the set s, in one pass over the whole stack
+#   when s is the ladder 0..n-1 (in any order):
+#   - the nearest rung to z is its real part
+#     rounded into [0,n-1];
+#   - the nearest point of a row to each rung is
+#     found by one sorted binary search (real
+#     rows) or one kd-tree query (complex rows)
+#     over all rows, with row r moved r*w away,
+#     farther than any distance within a row;
+#     small complex rows compare all pairs.
+#   Distances are taken as abs(e-s), as in
+#   nearest, so they equal those of Hausdorff.
+###############################################
+def Hausdorff_batch(e,s):
+    e = np.atleast_2d(e)
+    s = np.asarray(s)
+    n = len(s)
+    if(not np.array_equal(np.sort(s),np.arange(n))):
+        return np.array([Hausdorff(row,s) for row in e])
+    m,k = e.shape
+    # rows of e to the ladder
+    de = np.amax(np.abs(e - np.clip(np.rint(e.real),0,n-1)),axis=1)
+    # ladder to the rows of e
+    w = 2.*(np.amax(np.abs(e)) + n)
+    rows = np.repeat(np.arange(m),n)
+    q = np.tile(s.astype(float),m)
+    if(np.iscomplexobj(e) and np.any(e.imag) and n*k<=4096):
+        # small rows: all distances at once
+        ds = np.amin(np.abs(s.astype(float)[None,:,None] - e[:,None,:]),axis=2).ravel()
+    elif(np.iscomplexobj(e) and np.any(e.imag)):
+        t = cKDTree(np.column_stack((np.repeat(np.arange(m),k)*w,e.real.ravel(),e.imag.ravel())))
+        dist,idx = t.query(np.column_stack((rows*w,q,np.zeros(m*n))))
+        ds = np.abs(q - e.ravel()[idx])
+    else:
+        r = np.sort(e.real,axis=1)
+        j = np.searchsorted((r + (np.arange(m)*w)[:,None]).ravel(),q + rows*w) - rows*k
+        lo = r[rows,np.clip(j-1,0,k-1)]
+        hi = r[rows,np.clip(j,0,k-1)]
+        ds = np.minimum(np.abs(q-lo),np.abs(q-hi))
+    return np.maximum(de,np.amax(ds.reshape(m,n),axis=1))
+###############################################
 ###             specR                       ###
 ###############################################
 #   Computes Spectral-Degree Rankability Measure.
+#   A scipy.sparse adjacency matrix is never
+#   densified as a whole, see sparseEigvals; its
+#   measure agrees with the dense path to within
+#   1e-8 (block-triangular eigenvalues are, if
+#   anything, more accurate than dense ones).
+#   If a strongly connected block of the sparse
+#   graph is too large to densify within budget
+#   bytes, MemoryError is raised, unless approx:
+#   then the measure is approximated instead by
+#   specR_approx (seed 0), without densifying,
+#   and no longer holds to 1e-8. With approx,
+#   the measure is returned with an error
+#   estimate (see specR_approx), 0 when exact.
+#   Dense matrices are memoized in cache when it
+#   is enabled by specRCache. With a SpecTracker,
+#   the eigenvalues of a dense matrix are warm-
+#   started from the tracker's previous call.
+#   The graph Laplacian of a dense matrix may be
+#   given as lap (as Tournament keeps it).
 ###############################################
-def specR(a):
+def specR(a,budget=2**28,tracker=None,approx=False,lap=None):
+    if(sparse.issparse(a)):
+        return _specRSparse(a,budget,approx)
+    if(approx):
+        return specR(a,tracker=tracker,lap=lap), 0.
+    if(cache is not None):
+        key = cache.key('specR',a)
+        r = cache.get(key)
+        if(r is None):
+            r = _specRDense(np.asarray(a),tracker,lap)
+            cache.put(key,r)
+        return r
+    return _specRDense(a,tracker,lap)
+def _specRDense(a,tracker=None,lap=None):
     # given graph Laplacian
     n = len(a)
-    x = np.array([np.sum(a[i,:]) for i in range(n)])
-    d = np.diag(x)
-    l = d - a;
+    if(lap is None):
+        x = np.array([np.sum(a[i,:]) for i in range(n)])
+        d = np.diag(x)
+        l = d - a;
+    else:
+        x = np.diag(lap).copy()
+        l = lap
+    # perfect dominance graph spectrum and out-degree
+    s = np.array([n-k for k in range(1,n+1)])
+    # eigenvalues of given graph Laplacian
+    instrument.add('eigvals','rows',n)
+    instrument.add('eigvals','solves')
+    with instrument.phase('eigvals'):
+        e = np.linalg.eigvals(l) if tracker is None else tracker.eigvals(l)
+    # rankability measure
+    with instrument.phase('Hausdorff'):
+        return 1. - ((Hausdorff(e,s)+Hausdorff(x,s))/(2*(n-1)))
+def _specRSparse(a,budget,approx=False):
+    # given graph Laplacian
+    a = sparse.csr_matrix(a,dtype=float)
+    n = a.shape[0]
+    x = np.asarray(a.sum(axis=1)).ravel()
+    l = sparse.diags(x) - a
     # perfect dominance graph spectrum and out-degree
     s = np.array([n-k for k in range(1,n+1)])
     # eigenvalues of given graph Laplacian
-    e = np.linalg.eigvals(l)
+    try:
+        with instrument.phase('eigvals'):
+            e = sparseEigvals(l,budget)
+    except MemoryError:
+        if(not approx):
+            raise
+        # block too large to densify
+        instrument.add('eigvals','approx')
+        return specR_approx(a,seed=0)[:2]
     # rankability measure
-    return 1. - ((Hausdorff(e,s)+Hausdorff(x,s))/(2*(n-1)))
+    with instrument.phase('Hausdorff'):
+        r = 1. - ((Hausdorff(e,s)+Hausdorff(x,s))/(2*(n-1)))
+    return (r, 0.) if approx else r
+###############################################
+###             specR_batch                 ###
+###############################################
+#   Computes Spectral-Degree Rankability Measure
+#   of each matrix in a (rounds x n x n) stack
+#   with one stacked eigensolve. Only matrices
+#   missing from the specRCache are solved. The
+#   stack of their graph Laplacians may be given
+#   as lap.
+###############################################
+def specR_batch(a,lap=None):
+    a = np.asarray(a,dtype=float)
+    if(cache is None):
+        return _specRBatch(a,lap)
+    keys = [cache.key('specR_batch',b) for b in a]
+    r = [cache.get(key) for key in keys]
+    miss = [k for k in range(len(r)) if r[k] is None]
+    if(len(miss)>0):
+        rm = _specRBatch(a[miss],None if lap is None else np.asarray(lap)[miss])
+        for k in range(len(miss)):
+            r[miss[k]] = rm[k]
+            cache.put(keys[miss[k]],rm[k])
+    return np.array(r)
+def _specRBatch(a,lap=None):
+    # given graph Laplacians
+    n = a.shape[-1]
+    if(lap is None):
+        x = np.sum(a,axis=2)
+        l = x[:,:,None]*np.eye(n) - a
+    else:
+        l = np.asarray(lap,dtype=float)
+        x = np.diagonal(l,axis1=1,axis2=2).copy()
+    # perfect dominance graph spectrum and out-degree
+    s = np.array([n-k for k in range(1,n+1)])
+    # eigenvalues of given graph Laplacians
+    instrument.add('eigvals','rows',n*len(a))
+    instrument.add('eigvals','solves',len(a))
+    with instrument.phase('eigvals'):
+        e = np.linalg.eigvals(l)
+    # rankability measures
+    with instrument.phase('Hausdorff'):
+        return 1. - ((Hausdorff_batch(e,s)+Hausdorff_batch(x,s))/(2*(n-1)))
+###############################################
+###             specR_approx                ###
+###############################################
+#   Approximates the Spectral-Degree Rankability
+#   Measure without a full eigensolve. Returns
+#   the measure, an error estimate, and the
+#   terms of the error estimate (see below).
+#   The degree term is exact. As in
+#   sparseEigvals, the spectrum is the union of
+#   those of the diagonal blocks of the strongly
+#   connected components: singleton blocks and
+#   blocks of at most small teams are solved
+#   exactly, so only the union of the larger
+#   ones, r, is approximated. Its eigenvalues
+#   are replaced by
+#   - the k eigenvalues of largest and smallest
+#     real part, found by Arnoldi iteration
+#     (scipy eigs), and
+#   - quantiles of the real parts of the rest
+#     of its spectrum, read off a kernel polynomial
+#     estimate of its counting function: degree m
+#     Jackson-damped Chebyshev moments
+#     tr(T_j(r))/len(r), which hold for any
+#     matrix, are estimated by probes random
+#     vectors.
+#   Complex eigenvalues make the moments grow
+#   past [-1,1], where those of real spectra lie;
+#   from the first one larger than 2 in size on,
+#   they are dropped.
+#   The real parts of the quantiles are trusted
+#   to within the kernel width pi*h/m, where
+#   [0,2h] contains the real parts of r, plus
+#   the spread between the quantiles of the two
+#   halves of the probes. Their imaginary parts
+#   are bounded by b, a coarse Arnoldi estimate
+#   of the largest one of r (or else the norm of
+#   the skew part of r, Bendixson).
+#   The error estimate is how far the Hausdorff
+#   distance may move if every quantile moves
+#   that much along the real axis and by b along
+#   the imaginary axis, plus sqrt(1e-8)*h for the
+#   Arnoldi eigenvalues, which may be defective.
+#   The terms, a dict, are the error estimates
+#   with only the kernel width ('kernel'), only
+#   the spread of the probes ('probe'), or only
+#   b ('imag'), without the Arnoldi allowance.
+#   The moved quantiles stay within the real
+#   parts of the Arnoldi eigenvalues, which
+#   bound those of the rest of the spectrum.
+#   The estimate is empirical, not certified.
+#   Larger m and probes cost more matrix-vector
+#   products and shrink it. Graphs whose r has
+#   fewer than 2k+2 rows are measured exactly.
+###############################################
+def specR_approx(a,m=200,probes=16,k=6,small=32,seed=None):
+    if(sparse.issparse(a)):
+        a = sparse.csr_matrix(a,dtype=float)
+        x = np.asarray(a.sum(axis=1)).ravel()
+    else:
+        a = sparse.csr_matrix(np.asarray(a,dtype=float))
+        x = np.asarray(a.sum(axis=1)).ravel()
+    l = (sparse.diags(x) - a).tocsr()
+    l.eliminate_zeros()
+    n = len(x)
+    terms = {'kernel': 0.,'probe': 0.,'imag': 0.}
+    # perfect dominance graph spectrum and out-degree
+    s = np.array([n-j for j in range(1,n+1)])
+    # exact eigenvalues of the singleton and small blocks
+    nc,lab = connected_components(l,directed=True,connection='strong')
+    size = np.bincount(lab,minlength=nc)
+    order = np.argsort(lab,kind='stable')
+    start = np.cumsum(size) - size
+    exact = [l.diagonal()[size[lab]==1]]
+    for c in np.flatnonzero((size>1) & (size<=small)):
+        idx = order[start[c]:start[c]+size[c]]
+        exact.append(np.linalg.eigvals(l[idx,:][:,idx].toarray()))
+    r = np.flatnonzero((size[lab]>1) & (size[lab]>small))
+    if(len(r)<2*k+2):
+        if(len(r)>0):
+            exact.append(np.linalg.eigvals(l[r,:][:,r].toarray()))
+        e = np.concatenate(exact)
+        return 1. - ((Hausdorff(e,s)+Hausdorff(x,s))/(2*(n-1))), 0., terms
+    exact = np.concatenate(exact)
+    l = l[r,:][:,r]
+    nr = len(r)
+    h = np.amax(x[r])
+    # extremal eigenvalues
+    ext = []
+    for which in ['SR','LR']:
+        try:
+            ext.append(eigs(l,k=k,which=which,return_eigenvectors=False,tol=1e-8))
+        except ArpackNoConvergence as err:
+            ext.append(err.eigenvalues)
+        except ArpackError:
+            ext.append(np.zeros(0))
+    # ranks of the eigenvalues between them, in order of real part, and the
+    # range of their real parts
+    ranks = np.arange(len(ext[0]),nr-len(ext[1]))
+    lo = np.amax(ext[0].real) if len(ext[0])>0 else 0.
+    hi = np.amin(ext[1].real) if len(ext[1])>0 else 2.*h
+    ext = np.concatenate(ext)
+    # largest imaginary part, or Bendixson bound: the norm of the skew part of l
+    try:
+        b = np.amax(np.abs(eigs(l,k=k,which='LI',return_eigenvectors=False,tol=1e-2).imag))*1.01
+    except (ArpackError,ArpackNoConvergence):
+        w = (l - l.T)/2.
+        b = np.sqrt(max(eigsh(w.T@w,k=1,which='LA',return_eigenvectors=False,tol=1e-3)[0],0.))*1.001
+    # Chebyshev moments of (l-h)/h by probe
+    rng = np.random.default_rng(seed)
+    z = rng.choice([-1.,1.],size=(nr,probes))
+    mu = np.zeros((m,probes))
+    t0 = z
+    t1 = (l@z - h*z)/h
+    mu[0] = np.sum(z*t0,axis=0)
+    mu[1] = np.sum(z*t1,axis=0)
+    for j in range(2,m):
+        t0,t1 = t1, 2.*(l@t1 - h*t1)/h - t0
+        mu[j] = np.sum(z*t1,axis=0)
+    # moments from the first one far outside [-1,1] on diverge (complex spectrum)
+    out = np.flatnonzero(np.abs(np.mean(mu,axis=1)/nr)>2.)
+    m = max(int(out[0]) if len(out)>0 else m,2)
+    mu = mu[:m]
+    # quantiles of real parts from all probes and from each half
+    q = _quantiles(np.mean(mu,axis=1)/nr,nr,h,lo,hi)[ranks]
+    qa = _quantiles(np.mean(mu[:,:probes//2],axis=1)/nr,nr,h,lo,hi)[ranks]
+    qb = _quantiles(np.mean(mu[:,probes//2:],axis=1)/nr,nr,h,lo,hi)[ranks]
+    kernel = np.pi*h/m
+    probe = np.amax(np.abs(qa-qb))
+    # Hausdorff distance, with the exact and Arnoldi eigenvalues fixed
+    e = np.concatenate((exact,q,ext))
+    haus = Hausdorff(e,s)
+    fixed = np.concatenate((exact,ext))
+    de = nearest(s,fixed) if len(fixed)>0 else np.full(n,np.inf)
+    sl = np.amax(nearest(fixed,s)) if len(fixed)>0 else 0.
+    # nearest quantile to each rung, and distances of the rungs to [lo,hi]
+    j = np.searchsorted(q,s)
+    below = q[np.clip(j-1,0,len(q)-1)]
+    above = q[np.clip(j,0,len(q)-1)]
+    qn = np.where(np.abs(s-below)<=np.abs(s-above),below,above)
+    dq = np.abs(s-qn)
+    gap = np.maximum(np.maximum(lo-s,s-hi),0.)
+    # distance of the quantiles to the ladder, and of points to [0,n-1], within
+    # which every point is at most 1/2 from the ladder
+    dq2 = nearest(q,s)
+    def out(t):
+        return np.maximum(np.maximum(-t,t-(n-1)),0.)
+    # its range as the quantiles move by delta along the real axis, within
+    # [lo,hi], and by b along the imaginary axis
+    def bound(delta,b):
+        dl = np.amax(np.minimum(de,np.maximum(dq-delta,gap)))
+        far = np.maximum(np.abs(s-np.maximum(qn-delta,lo)),np.abs(s-np.minimum(qn+delta,hi)))
+        du = np.amax(np.minimum(de,np.hypot(far,b)))
+        su = np.amax(np.hypot(np.minimum(dq2+delta,np.maximum(0.5,np.maximum(out(np.maximum(q-delta,lo)),out(np.minimum(q+delta,hi))))),b))
+        return max(max(du,su,sl)-haus,haus-max(dl,sl))/(2*(n-1))
+    terms = {'kernel': bound(kernel,0.),'probe': bound(probe,0.),'imag': bound(0.,b)}
+    # rankability measure, error estimate, and its terms
+    return 1. - ((haus+Hausdorff(x,s))/(2*(n-1))), bound(kernel+probe,b) + 1e-4*h/(2*(n-1)), terms
+def _quantiles(mu,n,h,lo,hi):
+    m = len(mu)
+    j = np.arange(m)
+    # Jackson damping
+    g = ((m-j+1)*np.cos(np.pi*j/(m+1))+np.sin(np.pi*j/(m+1))/np.tan(np.pi/(m+1)))/(m+1)
+    # number of eigenvalues with real part below h+h*y
+    y = np.linspace(-1.,1.,20*m+1)
+    th = np.arccos(y)
+    c = th/np.pi*g[0]*mu[0] + 2.*np.sum((g[1:]*mu[1:])[:,None]*np.sin(np.outer(j[1:],th))/(j[1:,None]*np.pi),axis=0)
+    c = np.maximum.accumulate(n*(1.-c))
+    q = np.interp(np.arange(n)+0.5,c,h+h*y)
+    return np.clip(q,lo,hi)
+###############################################
+###             SpecRCache                  ###
+###############################################
+#   Content-addressed cache of rankability
+#   measures, keyed on a SHA-1 hash of the
+#   function name, shape, and bytes of the
+#   adjacency matrix. Keeps the maxsize most
+#   recently used entries in memory and, if path
+#   is given, one .npy file per entry in path so
+#   that other processes and later runs share
+#   them. specR and specR_batch results are kept
+#   apart, as they may differ in the last bit.
+###############################################
+CacheInfo = namedtuple('CacheInfo',['hits','disk_hits','misses','maxsize','currsize'])
+class SpecRCache:
+    def __init__(self,maxsize=4096,path=None):
+        self.maxsize = maxsize
+        self.path = path
+        self.lru = OrderedDict()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if(path is not None):
+            os.makedirs(path,exist_ok=True)
+    def key(self,name,a):
+        a = np.ascontiguousarray(a,dtype=float)
+        h = hashlib.sha1(name.encode())
+        h.update(str(a.shape).encode())
+        h.update(a.tobytes())
+        return h.hexdigest()
+    def get(self,key):
+        if(key in self.lru):
+            self.lru.move_to_end(key)
+            self.hits = self.hits + 1
+            instrument.add('cache','hits')
+            return self.lru[key]
+        if(self.path is not None):
+            try:
+                r = float(np.load(os.path.join(self.path,key+'.npy')))
+                self.disk_hits = self.disk_hits + 1
+                instrument.add('cache','disk_hits')
+                self._remember(key,r)
+                return r
+            except (OSError,ValueError):
+                pass
+        self.misses = self.misses + 1
+        instrument.add('cache','misses')
+        return None
+    def put(self,key,r):
+        r = float(r)
+        self._remember(key,r)
+        if(self.path is not None):
+            try:
+                tmp = os.path.join(self.path,key+'.%d.tmp' % os.getpid())
+                with open(tmp,'wb') as f:
+                    np.save(f,np.float64(r))
+                os.replace(tmp,os.path.join(self.path,key+'.npy'))
+            except OSError:
+                pass
+    def _remember(self,key,r):
+        self.lru[key] = r
+        self.lru.move_to_end(key)
+        while(len(self.lru)>self.maxsize):
+            self.lru.popitem(last=False)
+    def info(self):
+        return CacheInfo(self.hits,self.disk_hits,self.misses,self.maxsize,len(self.lru))
+# specR cache, disabled by default
+cache = None
+# default on-disk store
+CACHE = os.path.join(os.path.dirname(os.path.abspath(__file__)),'..','DataFiles','PythonResults','specRCache')
+###############################################
+###             specRCache                  ###
+###############################################
+#   Enables the specR cache with the given
+#   maxsize and on-disk path (in memory only if
+#   path is None), or disables it if maxsize is
+#   0. Returns the cache.
+###############################################
+def specRCache(maxsize=4096,path=None):
+    global cache
+    cache = SpecRCache(maxsize,path) if maxsize>0 else None
+    return cache
+# SPECR_CACHE (set to anything but 0) enables the cache on disk in CACHE at
+# import, so in every process of a sweep
+if(os.environ.get('SPECR_CACHE','0') not in ('','0')):
+    specRCache(path=CACHE)
+###############################################
+###             sparseEigvals               ###
+###############################################
+#   Eigenvalues of a sparse matrix l. Ordering
+#   the strongly connected components of its
+#   graph topologically makes l block upper
+#   triangular, so its spectrum is the union of
+#   the spectra of the diagonal blocks. Singleton
+#   blocks are read off the diagonal; larger
+#   blocks are densified one at a time and may
+#   not exceed budget bytes.
+###############################################
+def sparseEigvals(l,budget=2**28):
+    l = sparse.csr_matrix(l)
+    l.eliminate_zeros()
+    nc,lab = connected_components(l,directed=True,connection='strong')
+    # eigenvalues of singleton blocks
+    e = l.diagonal().astype(complex)
+    size = np.bincount(lab,minlength=nc)
+    instrument.add('eigvals','rows',l.shape[0])
+    instrument.add('eigvals','solves',int(np.sum(size>1)))
+    if(np.all(size==1)):
+        return e.real
+    # eigenvalues of larger blocks
+    order = np.argsort(lab,kind='stable')
+    start = np.cumsum(size) - size
+    for c in np.flatnonzero(size>1):
+        m = size[c]
+        if(8*m*m>budget):
+            raise MemoryError('strongly connected block of size %d exceeds dense budget of %d bytes' % (m,budget))
+        idx = order[start[c]:start[c]+m]
+        e[idx] = np.linalg.eigvals(l[idx,:][:,idx].toarray())
+    return e
+###############################################
+###             SpecTracker                 ###
+###############################################
+#   Eigenvalues of a slowly changing dense
+#   matrix l, such as the Laplacian of
+#   successive rounds, warm-started from the
+#   previous call. As in sparseEigvals, the
+#   spectrum is the union of those of the
+#   diagonal blocks of the strongly connected
+#   components:
+#   - a singleton block is its diagonal entry;
+#   - a block over the same teams as one of the
+#     previous call, with equal entries, reuses
+#     its eigenvalues;
+#   - any other block is solved.
+#   A round's games only change the blocks of
+#   the teams that played, so early in a season,
+#   or in leagues that play within conferences,
+#   most of the work is reused or split into
+#   small solves. Once solving the changed blocks
+#   would cost more than full of a full solve
+#   (sum of cubed sizes, say one giant
+#   component), l is solved in full instead.
+#   The counters reused, solved, and fulls
+#   record how the blocks and calls were
+#   answered. The eigenvalues agree with a full
+#   solve to roundoff, not bitwise.
+###############################################
+class SpecTracker:
+    def __init__(self,full=0.5):
+        self.full = full
+        self.blocks = {}
+        self.reused = 0
+        self.solved = 0
+        self.fulls = 0
+    def eigvals(self,l):
+        l = np.asarray(l,dtype=float)
+        n = len(l)
+        nc,lab = connected_components(sparse.csr_matrix(l),directed=True,connection='strong')
+        # eigenvalues of singleton blocks
+        e = np.diag(l).astype(complex)
+        size = np.bincount(lab,minlength=nc)
+        order = np.argsort(lab,kind='stable')
+        start = np.cumsum(size) - size
+        # blocks, and those unchanged since the previous call
+        blocks = {}
+        solve = []
+        for c in np.flatnonzero(size>1):
+            idx = order[start[c]:start[c]+size[c]]
+            key = idx.tobytes()
+            b = l[np.ix_(idx,idx)]
+            prev = self.blocks.get(key)
+            if(prev is not None and np.array_equal(prev[0],b)):
+                e[idx] = prev[1]
+                blocks[key] = prev
+                self.reused = self.reused + 1
+            else:
+                solve.append((key,idx,b))
+        if(sum(float(len(idx))**3 for key,idx,b in solve)>self.full*float(n)**3):
+            # too much changed: full solve, unchanged blocks kept
+            self.fulls = self.fulls + 1
+            self.blocks = blocks
+            return np.linalg.eigvals(l)
+        for key,idx,b in solve:
+            e[idx] = np.linalg.eigvals(b)
+            blocks[key] = (b,e[idx])
+            self.solved = self.solved + 1
+        self.blocks = blocks
+        return e
+###############################################
+###             edgeKP                      ###
+###############################################
+#   Minimum number of edge changes (k) and the
+#   number of permutations attaining it (p) by
+#   subset dynamic programming. f[S] is the least
+#   cost of ranking the teams in S first and c[S]
+#   counts the orderings of S attaining it; the
+#   subsets are swept by size in chunks of rows.
+#   The counts are int64, exact up to 20!; a
+#   count that would not fit raises OverflowError.
+#   f, c, and the subset sizes take 17*2^n bytes
+#   (17MB for n=20, 544MB for n=25), plus the
+#   indices of the largest layer of subsets,
+#   8*C(n,n/2) bytes, and chunk x n per chunk.
+###############################################
+def edgeKP(a,tol=1e-9,chunk=2**16):
+    a = np.asarray(a,dtype=float)
+    n = len(a)
+    # cost of ranking i directly above j
+    w = np.abs(1.-a) + np.abs(a.T)
+    np.fill_diagonal(w,0.)
+    # subset values, counts, and sizes
+    N = 1<<n
+    f = np.zeros(N)
+    c = np.zeros(N,dtype=np.int64)
+    c[0] = 1
+    size = np.zeros(N,dtype=np.uint8)
+    for b in range(n):
+        size[1<<b:1<<(b+1)] = size[:1<<b] + 1
+    bit = 1<<np.arange(n)
+    for m in range(1,n+1):
+        layer = np.flatnonzero(size==m)
+        for t in range(0,len(layer),chunk):
+            S = layer[t:t+chunk]
+            B = (S[:,None]&bit)!=0
+            # ranking j last in S after the rest T
+            T = S[:,None]^bit
+            cand = np.where(B,f[np.where(B,T,0)] + B.astype(float)@w,np.inf)
+            f[S] = np.amin(cand,axis=1)
+            cnt = np.where(cand<=f[S][:,None]+tol,c[np.where(B,T,0)],0)
+            # orderings of m teams fit in int64 up to m=20
+            if(m>20 and np.amax(np.sum(cnt,axis=1,dtype=float))>=0.999*2.**63):
+                raise OverflowError('more than 2^63 optimal orderings')
+            c[S] = np.sum(cnt,axis=1)
+    # minimum number of edge changes and its permutation count
+    k = f[-1] + np.sum(np.abs(np.diag(a)))
+    p = int(c[-1])
+    return k, p
 ###############################################
 ###             edgeR                       ###
 ###############################################
-#   Computes edge Rankability Measure using brute force approach.
+#   Computes edge Rankability Measure.
 ###############################################
 def edgeR(a):
+    # size
+    n = len(a)
+    # minimum number of edge changes and number of permutations that gave this k
+    k,p = edgeKP(a)
+    # rankability measure
+    return 1.0 - 2.0*k*p/(n*(n-1)*factorial(n))
+###############################################
+###             edgeR_mc                    ###
+###############################################
+#   Estimates the edge Rankability Measure of
+#   graphs too large for edgeKP. Each of runs
+#   independent searches, spread over workers
+#   processes, starts from a random ordering and
+#   alternates insertion local search with random
+#   kicks for iters rounds (see _edgeSearch).
+#   k is the least number of edge changes found.
+#   p is the bias-corrected Chao1 estimate of the
+#   number of optimal orderings from how often
+#   the runs end on the same one, with a
+#   log-normal 95% interval, capped at n!. If every optimal
+#   ordering found was seen only once, the runs
+#   say nothing about the unseen ones: p and the
+#   measure are then nan, p is only known to lie
+#   in [d,n!] for the d orderings found, and the
+#   measure only within the matching bounds.
+#   Returns the measure, k, p, and a dict of the
+#   intervals of p and of the measure (from that
+#   of p, at the k found), and the Wilson 95%
+#   interval of the fraction of runs that reached
+#   k ('hit_rate'), which tells how reliably the
+#   search finds k, not how close k is.
+###############################################
+def edgeR_mc(a,runs=64,iters=50,workers=None,seed=0,tol=1e-9):
+    a = np.asarray(a,dtype=float)
+    n = len(a)
+    # cost of ranking i directly above j
+    w = np.abs(1.-a) + np.abs(a.T)
+    np.fill_diagonal(w,0.)
+    seeds = np.random.SeedSequence(seed).spawn(runs)
+    args = ([w]*runs,seeds,[iters]*runs,[tol]*runs)
+    if(workers==1):
+        res = list(map(_edgeSearch,*args))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            res = list(ex.map(_edgeSearch,*args))
+    cost = np.array([c for c,order in res])
+    best = np.amin(cost)
+    hit = cost<=best+tol
+    k = best + np.sum(np.abs(np.diag(a)))
+    # Wilson interval of the fraction of runs reaching k
+    z = 1.96
+    f = np.mean(hit)
+    mid = (f + z*z/(2*runs))/(1 + z*z/runs)
+    half = z*sqrt(f*(1-f)/runs + z*z/(4*runs*runs))/(1 + z*z/runs)
+    # rankability measure for p orderings, with n! in logarithms
+    lnf = lgamma(n+1)
+    cap = float(factorial(n)) if n<=170 else np.inf
+    def measure(p):
+        return 1.0 - exp(log(2.0*k) + min(log(p),lnf) - log(n*(n-1)) - lnf) if k>0 else 1.0
+    # optimal orderings found and how often each was seen
+    order,count = np.unique([res[r][1] for r in np.flatnonzero(hit)],axis=0,return_counts=True)
+    d = len(order)
+    f1 = np.sum(count==1)
+    f2 = np.sum(count==2)
+    if(f1==d):
+        # all seen once: p is unbounded by the sample
+        return np.nan, k, np.nan, {'hit_rate': (mid-half,mid+half),'p': (d,cap),'r': (measure(cap),measure(d))}
+    # bias-corrected Chao1 estimate of the number of optimal orderings
+    t = f1*(f1-1)/(2.*(f2+1))
+    var = t + f1*(2*f1-1)**2/(4.*(f2+1)**2) + f1*f1*f2*(f1-1)**2/(4.*(f2+1)**4)
+    c = exp(z*sqrt(log(1. + var/(t*t)))) if t>0 else 1.
+    p = min(d+t,cap)
+    lo,hi = min(d+t/c,cap),min(d+t*c,cap)
+    return measure(p), k, p, {'hit_rate': (mid-half,mid+half),'p': (lo,hi),'r': (measure(hi),measure(lo))}
+###############################################
+###             _edgeSearch                 ###
+###############################################
+#   Iterated local search for an ordering of
+#   least cost sum(w[i,j], i ranked above j).
+#   A move reinserts one team at its best
+#   position: with the others in order o, putting
+#   e after the first q of them changes the cost
+#   by cumsum(w[o,e]-w[e,o])[q], O(n) for all q.
+#   A kick reinserts a few random teams at random
+#   positions. Returns the least cost and its
+#   ordering.
+###############################################
+def _edgeSearch(w,seed,iters,tol):
+    rng = np.random.default_rng(seed)
+    n = len(w)
+    def cost(order):
+        return np.sum(np.triu(w[np.ix_(order,order)],1))
+    def descend(order):
+        improved = True
+        while(improved):
+            improved = False
+            for e in rng.permutation(n):
+                p = int(np.flatnonzero(order==e)[0])
+                o = np.delete(order,p)
+                gain = np.r_[0.,np.cumsum(w[o,e]-w[e,o])]
+                q = int(np.argmin(gain))
+                if(gain[q]<gain[p]-tol):
+                    order = np.insert(o,q,e)
+                    improved = True
+        return order
+    order = descend(rng.permutation(n))
+    best = cost(order)
+    for it in range(iters):
+        kick = order.copy()
+        for e in rng.choice(n,size=min(n,3),replace=False):
+            kick = np.insert(kick[kick!=e],rng.integers(0,n),e)
+        kick = descend(kick)
+        c = cost(kick)
+        if(c<=best+tol):
+            order = kick
+            best = min(best,c)
+    return best, order
+###############################################
+###             edgeR_brute                 ###
+###############################################
+#   Computes edge Rankability Measure using brute force approach.
+#   Reference for edgeR, feasible up to n=9.
+###############################################
+def edgeR_brute(a):
     # size
     n = len(a)
     # complete dominance
@@ -81,9 +791,11 @@ def main():
             ]
     er = []
     sr = []
+    eb = []
     for k in range(len(adj)):
         er.append(edgeR(adj[k]))
         sr.append(specR(adj[k]))
+        eb.append(edgeR_brute(adj[k]))
     corr,pval = spearmanr(er,sr)
     print('Anderson et al. Digraph Examples: ')
     print('edgeR = [%.4f' % er[0], end='')
@@ -94,6 +806,14 @@ def main():
     for k in range(len(sr)):
         print(', %.4f' % sr[k], end='')
     print(']')
+    print('edgeR and edgeR_brute max diff = %.1e' % np.amax(np.abs(np.subtract(er,eb))))
+    # edgeR_mc against the exact k and p
+    agree = 0
+    for k in range(len(adj)):
+        ke,pe = edgeKP(adj[k])
+        r,km,pm,ci = edgeR_mc(adj[k],workers=1)
+        agree = agree + (abs(km-ke)<1e-9 and ci['p'][0]<=pe<=ci['p'][1])
+    print('edgeR_mc k and p interval agree with edgeKP on %d of %d' % (agree,len(adj)))
     print('edgeR and specR corr = %.4f' % corr)
     print('edgeR and specR pval = %.4f' % pval)
 if __name__ == '__main__':
@@ -0,0 +1,187 @@
+# specr: Config-Driven Rankability and Elo Correlation
+#
+# Runs the season analyses of the CFB-Rank-EloCorr and SQField-Rank-EloCorr
+# drivers for the datasets, years, Elo constants, and correlation types of a
+# TOML configuration file:
+#
+#   python -m specr run specr.toml [--workers N] [--force]
+#   python -m specr list
+#
+# The datasets are discovered under DataFiles: CFB/<conference>/<year>games.txt
+# is the dataset "CFB/<conference>" and SinquefieldCup/SinquefieldCup<year>.csv
+# the dataset "SinquefieldCup". Each (dataset, year) goes through the parse,
+# simulate, score, and write stages and is saved as <results>/<dataset>/<year>.json;
+# a season whose file is newer than its games file and was computed with the
+# same constants is not computed again. The round by round and summary CSVs of
+# each dataset are then assembled from the season files, in the format of the
+# driver CSVs (see sweep.cfbWrite and sweep.sqfieldWrite). The stages are those
+# of the drivers (see pipeline).
+#
+# A configuration lists the datasets (names may be fnmatch patterns) with
+# optional first and last years, Elo constants K, H (CFB home advantage), and
+# X, and correlation types corr; top level keys give defaults, results gives
+# the output directory (relative to the configuration file), workers the
+# number of worker processes (0 for all cores), and cache = true memoizes the
+# rankability measures on disk in rankability.CACHE. See specr.toml.
+import os
+import json
+import argparse
+import fnmatch
+try:
+    import tomllib
+except ImportError:
+    import tomli as tomllib
+from rankability import specRCache, CACHE
+from gamelog import DATA
+from pipeline import discover, parse, simulate, score
+from sweep import driver, run as sweepRun, cfbWrite, sqfieldWrite, RESULTS
+import instrument
+
+###############################################
+###             season                      ###
+###############################################
+#   Runs the stages of one (dataset, year) and
+#   writes its season file with the constants.
+###############################################
+def season(name,kind,year,src,params,out):
+    with instrument.run('%s/%d' % (name,year)):
+        with instrument.phase('parse'):
+            s = parse(kind,src)
+        adjs,history = simulate(s,params['K'],params['X'])
+        res = score(kind,s,adjs,history,params['corr'],params['H'])
+        with instrument.phase('write'):
+            os.makedirs(os.path.dirname(out),exist_ok=True)
+            tmp = out + '.%d.tmp' % os.getpid()
+            with open(tmp,'w') as f:
+                json.dump(dict(res,dataset=name,year=year,params=params),f)
+            os.replace(tmp,out)
+    return res
+###############################################
+###             upToDate                    ###
+###############################################
+#   Whether the season file out is newer than
+#   its games file src and has the constants
+#   params.
+###############################################
+def upToDate(out,src,params):
+    try:
+        if(os.path.getmtime(out)<os.path.getmtime(src)):
+            return False
+        with open(out) as f:
+            return json.load(f)['params']==params
+    except (OSError,ValueError,KeyError):
+        return False
+###############################################
+###             jobs                        ###
+###############################################
+#   (name, kind, year, games file, constants) of
+#   each season of a configuration.
+###############################################
+def jobs(config,datasets):
+    defaults = {'cfb': driver('CFB-Rank-EloCorr'),'sqfield': driver('SQField-Rank-EloCorr')}
+    res = []
+    for entry in config.get('dataset',[]):
+        names = fnmatch.filter(datasets,entry['name'])
+        if(not names):
+            raise ValueError('no dataset matches %r (have %s)' % (entry['name'],', '.join(datasets)))
+        for name in names:
+            d = datasets[name]
+            mod = defaults[d.kind]
+            params = {}
+            for key in ['K','H','X']:
+                params[key] = float(entry.get(key,config.get(key,getattr(mod,key,0.))))
+            params['corr'] = list(entry.get('corr',config.get('corr',['SR'])))
+            for opt in params['corr']:
+                if(opt not in ('SR','KT','PR')):
+                    raise ValueError('unknown correlation type %r' % opt)
+            first = entry.get('first',min(d.paths)); last = entry.get('last',max(d.paths))
+            years = entry.get('years',[y for y in d.paths if first<=y<=last])
+            for year in years:
+                if(year not in d.paths):
+                    raise ValueError('%s has no games for %d' % (name,year))
+                res.append((name,d.kind,year,d.paths[year],params))
+    return res
+###############################################
+###             runConfig                   ###
+###############################################
+#   Computes the seasons of a configuration that
+#   are not up to date (all of them if force),
+#   with the specR cache if so configured, on
+#   workers processes (from the configuration
+#   if None, all cores if 0), then writes the round
+#   by round and summary CSVs of each dataset
+#   and prints the correlation of the final
+#   rankability with the Elo correlation and
+#   Elo predictability of the seasons.
+###############################################
+def runConfig(path,workers=None,force=False,data=DATA):
+    with open(path,'rb') as f:
+        config = tomllib.load(f)
+    results = os.path.join(os.path.dirname(os.path.abspath(path)),config['results']) if 'results' in config else os.path.join(RESULTS,'specr')
+    if(workers is None):
+        workers = config.get('workers',0)
+    workers = workers or None
+    if(config.get('cache',False)):
+        specRCache(path=CACHE)
+    todo = []; seasons = []
+    for name,kind,year,src,params in jobs(config,discover(data)):
+        out = os.path.join(results,name,'%d.json' % year)
+        seasons.append((name,kind,year,out,params))
+        if(force or not upToDate(out,src,params)):
+            todo.append((name,kind,year,src,params,out))
+    print('%d of %d seasons to compute' % (len(todo),len(seasons)))
+    sweepRun(season,todo,workers)
+    # round by round and summary CSVs of each dataset
+    for name,kind in dict.fromkeys((name,kind) for name,kind,year,out,params in seasons):
+        res = []
+        for n,k,year,out,params in seasons:
+            if(n==name):
+                with open(out) as f:
+                    res.append(json.load(f))
+        write(os.path.join(results,name),kind,res)
+    if(instrument.ENABLED):
+        instrument.export(os.path.join(results,'Profile'))
+###############################################
+###             write                       ###
+###############################################
+#   Writes the Rounds.csv and Summary.csv files
+#   of the season results res of a dataset of
+#   kind 'cfb' or 'sqfield' in directory path,
+#   in the format of the driver CSVs with one
+#   EloCorr column per correlation type, and
+#   prints the correlations.
+###############################################
+def write(path,kind,res):
+    corr = res[0]['params']['corr']
+    cols = ['EloCorr '+opt for opt in corr]
+    years = [r['year'] for r in res]
+    f1 = open(os.path.join(path,'Rounds.csv'),'w')
+    f2 = open(os.path.join(path,'Summary.csv'),'w')
+    if(kind=='cfb'):
+        cfbWrite(f1,f2,res[0]['dataset'],years,[([r['elo_corr'][opt] for opt in corr],r['rankability'],r['elo_pred'])
+                                               for r in res],cols)
+    else:
+        print('%s: ' % res[0]['dataset'])
+        sqfieldWrite(f1,f2,years,[([r['elo_corr'][opt] for opt in corr],r['rankability']) for r in res],cols)
+    f1.close()
+    f2.close()
+###############################################
+###             main                        ###
+###############################################
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m specr',description='Config-driven rankability and Elo correlation.')
+    sub = parser.add_subparsers(dest='command',required=True)
+    p = sub.add_parser('run',help='run the seasons of a TOML configuration')
+    p.add_argument('config')
+    p.add_argument('--workers',type=int,help='worker processes (0 for all cores; default from the configuration)')
+    p.add_argument('--force',action='store_true',help='recompute up to date seasons')
+    sub.add_parser('list',help='list the datasets under DataFiles')
+    args = parser.parse_args(argv)
+    if(args.command=='list'):
+        for name,d in discover().items():
+            print('%-20s %-8s %d-%d (%d years)' % (name,d.kind,min(d.paths),max(d.paths),len(d.paths)))
+        return
+    runConfig(args.config,args.workers,args.force)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+# Stream Module
+#
+# This module computes rankability and Elo correlation online, from game
+# results that arrive one at a time (from an iterator, a pipe, or a local
+# socket), instead of re-reading a whole season file.
+# A round is closed when the boundary rule says the next game starts a new
+# one, or when the input ends. Closing a round costs one eigensolve and one
+# Elo update of the round's games, and gives the same rankability and Elo
+# correlation as the CFB-Rank-EloCorr and SQField-Rank-EloCorr drivers.
+import sys
+import socket
+import stat
+import os
+import argparse
+from collections import namedtuple
+import numpy as np
+from rankability import specR_batch
+from tournament import Tournament
+from elo import eloUpdate, eloCorr
+from gamelog import parseScore
+from sweep import driver
+
+# A game on day day, in which team i (from 0) scored s (1 win, 0.5 tie,
+# 0 loss) against team j
+Game = namedtuple('Game',['day','i','j','s'])
+###############################################
+###             boundary rules              ###
+###############################################
+#   A boundary rule new(prev,game,count) says
+#   whether game starts a new round, given the
+#   previous game and the number of games in the
+#   current round.
+###############################################
+def dateGap(days=4):
+    # CFB: a new round starts after a gap of more than days
+    return lambda prev,game,count: (game.day-prev.day+1)>days
+def everyGames(m):
+    # SinquefieldCup: m games per round
+    return lambda prev,game,count: count>=m
+###############################################
+###             stream                      ###
+###############################################
+#   Yields (round, rankability, elo_corr) each
+#   time a round of games between n teams closes,
+#   where elo_corr is a dict of the SR, KT, and PR
+#   correlation with the previous round's ratings
+#   (None after the first round).
+###############################################
+def stream(games,n,K,X,new):
+    tour = Tournament(n)
+    rating = np.zeros(n)
+    prev = None
+    rnd = []
+    k = 0
+    for game in games:
+        if(prev is not None and new(prev,game,len(rnd))):
+            k = k + 1
+            yield _close(tour,rating,rnd,K,X,k)
+            rnd = []
+        tour.play(game.i,game.j,game.s)
+        rnd.append(game)
+        prev = game
+    if(len(rnd)>0):
+        yield _close(tour,rating,rnd,K,X,k+1)
+def _close(tour,rating,rnd,K,X,k):
+    # Rankability
+    rankability = specR_batch(tour.adj[None,:,:],tour.lap[None,:,:])[0]
+    # Elo rating and Elo Correlation
+    last = rating.copy()
+    eloUpdate(rating,np.array([g.i for g in rnd]),np.array([g.j for g in rnd]),np.array([g.s for g in rnd]),K,X)
+    elo_corr = None
+    if(k>1):
+        elo_corr = {opt: c[0] for opt,c in eloCorr(np.vstack((last,rating))).items()}
+    return k, rankability, elo_corr
+###############################################
+###             game parsers                ###
+###############################################
+#   Parse CFB games lines and SinquefieldCup
+#   game rows into Games.
+###############################################
+def cfbRecords(lines):
+    for line in lines:
+        row = line.split(',')
+        if(len(row)<8):
+            continue
+        scorei = int(row[4]); scorej = int(row[7])
+        yield Game(int(row[0]),int(row[2])-1,int(row[5])-1,0.5+0.5*np.sign(scorei-scorej))
+def sqfieldRecords(lines):
+    for line in lines:
+        row = line.split(',')
+        if(len(row)<3 or '-' not in row[1]):
+            continue
+        score = [parseScore(t) for t in row[1].split('-')]
+        yield Game(0,int(row[0])-1,int(row[2])-1,0.5+0.5*np.sign(score[0]-score[1]))
+###############################################
+###             source                      ###
+###############################################
+#   Lines of standard input ('-'), of a local
+#   (Unix domain) socket, or of a file or pipe.
+###############################################
+def source(path):
+    if(path=='-'):
+        return sys.stdin
+    if(stat.S_ISSOCK(os.stat(path).st_mode)):
+        s = socket.socket(socket.AF_UNIX,socket.SOCK_STREAM)
+        s.connect(path)
+        return s.makefile('r')
+    return open(path)
+###############################################
+###             main                        ###
+###############################################
+#   Streams CFB or SinquefieldCup games and
+#   prints round, rankability, and Elo
+#   correlation as each round closes.
+###############################################
+def main():
+    parser = argparse.ArgumentParser(description='Online rankability and Elo correlation.')
+    parser.add_argument('format',choices=['cfb','sqfield'])
+    parser.add_argument('n',type=int,help='number of teams or players')
+    parser.add_argument('source',nargs='?',default='-',help='file, pipe, or socket (default: stdin)')
+    parser.add_argument('--opt',default='SR',choices=['SR','KT','PR'])
+    parser.add_argument('--gap',type=int,default=4,help='CFB round gap in days')
+    args = parser.parse_args()
+    lines = source(args.source)
+    if(args.format=='cfb'):
+        mod = driver('CFB-Rank-EloCorr')
+        games = stream(cfbRecords(lines),args.n,mod.K,mod.X,dateGap(args.gap))
+    else:
+        mod = driver('SQField-Rank-EloCorr')
+        games = stream(sqfieldRecords(lines),args.n,mod.K,mod.X,everyGames(args.n//2))
+    print('Round, Rankability, EloCorr')
+    for k,rankability,elo_corr in games:
+        print('%d,%.4f,%.4f' % (k,rankability,elo_corr[args.opt] if elo_corr else 0),flush=True)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,216 @@
+# Sweep Module
+#
+# This module runs the season analyses of the CFB-Rank-EloCorr and
+# SQField-Rank-EloCorr drivers over a pool of worker processes.
+# Every season is independent, so the seasons of all jobs are fanned out
+# together and the results are written in job and year order, regardless of
+# the order in which the workers finish.
+# With instrumentation enabled, each season is charged to a run named after it,
+# the statistics of the workers are gathered here, and the sweep writes them
+# next to its CSVs (see instrument).
+# If the specR cache is enabled (see rankability.specRCache), every worker
+# enables the same cache, so seasons share its on-disk entries.
+import os
+import sys
+import importlib.util
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from scipy.stats import spearmanr
+import rankability
+import instrument
+
+# Python and PythonResults directories
+DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS = os.path.join(DIR,'..','DataFiles','PythonResults')
+###############################################
+###             driver                      ###
+###############################################
+#   Imports a driver script, whose file name is
+#   not a valid module name, once per process.
+###############################################
+def driver(name):
+    if(name not in sys.modules):
+        spec = importlib.util.spec_from_file_location(name,os.path.join(DIR,name+'.py'))
+        mod = importlib.util.module_from_spec(spec)
+        sys.modules[name] = mod
+        spec.loader.exec_module(mod)
+    return sys.modules[name]
+###############################################
+###             season workers              ###
+###############################################
+def _cfbSeason(conf,year,opt,compact=False,warm=False):
+    mod = driver('CFB-Rank-EloCorr')
+    with instrument.run('%s/%d' % (conf,year)):
+        elo_corr,rankability,elo_rating = mod.cfbData(conf,year,opt,compact,warm)
+        with instrument.phase('eloPred'):
+            elo_pred = mod.eloPred(conf,year,elo_rating)
+    return elo_corr, rankability, elo_pred
+def _sqfieldSeason(year,opt,compact=False,warm=False):
+    with instrument.run('%d' % year):
+        return driver('SQField-Rank-EloCorr').sqfieldData(year,opt,compact,warm)
+def _init(cached,initializer,initargs):
+    # enables the parent's specR cache in a worker that lacks it
+    if(cached is not None and rankability.cache is None):
+        rankability.specRCache(*cached)
+    if(initializer is not None):
+        initializer(*initargs)
+def _traced(fn,enabled,*a):
+    # runs fn in a worker with instrumentation as in the parent
+    instrument.ENABLED = enabled
+    return fn(*a), instrument.take()
+###############################################
+###             run                         ###
+###############################################
+#   Returns [fn(*a) for a in args], computed by
+#   workers processes (all cores if None), each
+#   with the specR cache of this process and
+#   set up once by initializer(*initargs), e.g.
+#   with data shared by all tasks. With one
+#   worker everything runs in this process.
+###############################################
+def run(fn,args,workers=None,initializer=None,initargs=()):
+    args = list(args)
+    if(workers==1 or len(args)<=1):
+        if(initializer is not None):
+            initializer(*initargs)
+        return [fn(*a) for a in args]
+    c = rankability.cache
+    cached = None if c is None else (c.maxsize,c.path)
+    with ProcessPoolExecutor(max_workers=workers,initializer=_init,initargs=(cached,initializer,initargs)) as ex:
+        if(not instrument.ENABLED):
+            return list(ex.map(fn,*zip(*args)))
+        res = []
+        for r,rows in ex.map(_traced,[fn]*len(args),[True]*len(args),*zip(*args)):
+            instrument.merge(rows)
+            res.append(r)
+        return res
+###############################################
+###             cfbSweep                    ###
+###############################################
+#   Runs the (conference, years, opt) jobs and
+#   writes the round by round and summary CSVs,
+#   and the profile .json and .csv reports when
+#   instrumentation is enabled. compact and warm
+#   are passed on to cfbData.
+###############################################
+def cfbSweep(jobs,workers=None,rounds=os.path.join(RESULTS,'CFB-Rank-EloCorr-Rounds.csv'),
+             summary=os.path.join(RESULTS,'CFB-Rank-EloCorr-Summary.csv'),
+             profile=os.path.join(RESULTS,'CFB-Rank-EloCorr-Profile'),compact=False,warm=False):
+    jobs = [(conf,list(years),opt) for conf,years,opt in jobs]
+    res = iter(run(_cfbSeason,[(conf,year,opt,compact,warm) for conf,years,opt in jobs for year in years],workers))
+    # open files
+    f1 = open(rounds,'w+')
+    f2 = open(summary,'w+')
+    for conf,years,opt in jobs:
+        cfbWrite(f1,f2,conf,years,[([elo_corr],rankability,elo_pred) for elo_corr,rankability,elo_pred in
+                                   (next(res) for year in years)])
+    # close files
+    f1.close()
+    f2.close()
+    # instrumentation report
+    if(instrument.ENABLED):
+        instrument.export(profile)
+###############################################
+###             cfbWrite                    ###
+###############################################
+#   Writes the round by round (f1) and summary
+#   (f2) rows of the years of a conference and
+#   prints the correlations of the final
+#   rankability with the Elo correlations and
+#   predictability. res holds the Elo
+#   correlations (one series per column of
+#   cols), rankability, and Elo predictability
+#   of each year.
+###############################################
+def cfbWrite(f1,f2,conf,years,res,cols=('EloCorr',)):
+    # round by round analysis and summary
+    f1.write('%s, Year, Round, Rankability, %s\n' % (conf,', '.join(cols)))
+    f2.write('%s, Year, Rankability, %s, EloPred\n' % (conf,', '.join(cols)))
+    x = []; y = [[] for c in cols]; z = []
+    for year,(elo_corr,rankability,elo_pred) in zip(years,res):
+        f1.write(',%d,,%s\n' % (year,','*len(cols)))
+        f2.write(',%d,%s\n' % (year,','*len(cols)))
+        for k in range(len(rankability)):
+            f1.write(',,%d,%.4f' % (k+1,rankability[k]))
+            for c in elo_corr:
+                f1.write(',%.4f' % (c[k-1] if k>=1 else 0))
+            f1.write('\n')
+        x.append(rankability[-1])
+        f2.write(',,%.4f' % x[-1])
+        for c in range(len(cols)):
+            y[c].append(np.average(elo_corr[c],weights=[k for k in range(len(elo_corr[c]))]))
+            f2.write(',%.4f' % y[c][-1])
+        z.append(elo_pred)
+        f2.write(',%.4f\n' % z[-1])
+    # correlation between year summary data
+    print('%s: ' % conf)
+    if(len(x)<3):
+        return
+    for c in range(len(cols)):
+        corr,pval = spearmanr(x,y[c])
+        print('\tspecR and %s corr = %.4f' % (cols[c],corr))
+        print('\tspecR and %s pval = %.4f' % (cols[c],pval))
+    corr,pval = spearmanr(x,z)
+    print('\tspecR and EloPred corr = %.4f' % corr)
+    print('\tspecR and EloPred pval = %.4f' % pval)
+###############################################
+###             sqfieldSweep                ###
+###############################################
+#   Runs the SinquefieldCup years and writes the
+#   round by round and summary CSVs, and the
+#   profile reports when instrumentation is
+#   enabled. compact and warm are passed on to
+#   sqfieldData.
+###############################################
+def sqfieldSweep(years,opt="SR",workers=None,rounds=os.path.join(RESULTS,'SQField-Rank-EloCorr-Rounds.csv'),
+                 summary=os.path.join(RESULTS,'SQField-Rank-EloCorr-Summary.csv'),
+                 profile=os.path.join(RESULTS,'SQField-Rank-EloCorr-Profile'),compact=False,warm=False):
+    years = list(years)
+    res = run(_sqfieldSeason,[(year,opt,compact,warm) for year in years],workers)
+    # open files
+    f1 = open(rounds,'w+')
+    f2 = open(summary,'w+')
+    sqfieldWrite(f1,f2,years,[([elo_corr],rankability) for elo_corr,rankability in res])
+    # close files
+    f1.close()
+    f2.close()
+    # instrumentation report
+    if(instrument.ENABLED):
+        instrument.export(profile)
+###############################################
+###             sqfieldWrite                ###
+###############################################
+#   Writes the round by round (f1) and summary
+#   (f2) rows of the SinquefieldCup years and
+#   prints the correlations of the final
+#   rankability with the Elo correlations. res
+#   holds the Elo correlations (one series per
+#   column of cols) and rankability of each
+#   year.
+###############################################
+def sqfieldWrite(f1,f2,years,res,cols=('EloCorr',)):
+    # round by round analysis and summary
+    f1.write('Year, Round, Rankability, %s \n' % ', '.join(cols))
+    f2.write('Year, Rankability, %s \n' % ', '.join(cols))
+    x = []; y = [[] for c in cols]
+    for year,(elo_corr,rankability) in zip(years,res):
+        f1.write('%d,,%s\n' % (year,','*len(cols)))
+        f2.write('%d' % year)
+        for k in range(len(rankability)):
+            f1.write(',%d,%.4f' % (k+1,rankability[k]))
+            for c in elo_corr:
+                f1.write(',%.4f' % (c[k-1] if k>=1 else 0))
+            f1.write('\n')
+        x.append(rankability[-1])
+        f2.write(',%.4f' % x[-1])
+        for c in range(len(cols)):
+            y[c].append(np.average(elo_corr[c],weights=[k for k in range(len(elo_corr[c]))]))
+            f2.write(',%.4f' % y[c][-1])
+        f2.write('\n')
+    # correlation between year summary data
+    if(len(x)<3):
+        return
+    for c in range(len(cols)):
+        corr,pval = spearmanr(x,y[c])
+        print('\tspecR and %s corr = %.4f' % (cols[c],corr))
+        print('\tspecR and %s pval = %.4f' % (cols[c],pval))
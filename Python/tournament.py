@@ -0,0 +1,155 @@
+# Tournament Module
+#
+# This module maintains the round-by-round state of a tournament: the matches
+# played, the adjacency matrix of the dominance graph, the out-degree vector,
+# and the graph Laplacian, which specR and specR_batch accept in place of
+# forming their own.
+# Each game only touches the entries of the two teams that played (and sums
+# their two rows), so the cost of a round scales with the number of games
+# rather than the number of pairs of teams.
+# Only if history is requested are the rounds kept: either as a dense copy of
+# the adjacency matrix of each round or, for large leagues, compactly as the
+# games of each round (RoundHistory), from which the matrix of any round is
+# rebuilt exactly. Without history, memory stays flat across a season.
+from array import array
+import numpy as np
+import instrument
+###############################################
+###             Tournament                  ###
+###############################################
+#   State of a tournament between n teams. If
+#   history is True, endRound stores a copy of
+#   the adjacency matrix of each round in adjs;
+#   if compact is also True, adjs is instead a
+#   RoundHistory of the games of each round.
+###############################################
+class Tournament:
+    def __init__(self,n,history=False,compact=False):
+        self.n = n
+        self.history = history
+        self.matches = np.zeros((n,n))
+        self.adj = np.zeros((n,n))
+        self.x = np.zeros(n)
+        self.lap = np.zeros((n,n))
+        self.adjs = RoundHistory(n) if history and compact else []
+    ###########################################
+    #   Team i scores s against team j, where
+    #   s is 1 (win), 0.5 (tie), or 0 (loss).
+    ###########################################
+    def play(self,i,j,s):
+        if(self.history and type(self.adjs) is RoundHistory):
+            self.adjs.play(i,j,s)
+        # matches
+        self.matches[i,j] = self.matches[i,j] + s
+        self.matches[j,i] = self.matches[j,i] + (1.-s)
+        # adjacency matrix
+        total = self.matches[i,j] + self.matches[j,i]
+        self.adj[i,j] = self.matches[i,j]/total
+        self.adj[j,i] = self.matches[j,i]/total
+        # out-degree
+        self.x[i] = np.sum(self.adj[i,:])
+        self.x[j] = np.sum(self.adj[j,:])
+        # graph Laplacian, with +0 (as diag(x)-adj) where a team has no win
+        self.lap[i,j] = 0. - self.adj[i,j]
+        self.lap[j,i] = 0. - self.adj[j,i]
+        self.lap[i,i] = self.x[i]
+        self.lap[j,j] = self.x[j]
+    ###########################################
+    #   Closes the current round.
+    ###########################################
+    def endRound(self):
+        if(self.history and type(self.adjs) is RoundHistory):
+            self.adjs.endRound()
+        elif(self.history):
+            self.adjs.append(self.adj.copy())
+            instrument.add('endRound','bytes',self.adj.nbytes)
+###############################################
+###             RoundHistory                ###
+###############################################
+#   Adjacency matrices of the rounds of a
+#   tournament between n teams, stored as the
+#   games played (team i scored s against team
+#   j) in typed arrays and the index of the
+#   first game of each round, so memory grows
+#   with the number of games. A round is rebuilt
+#   by replaying the games up to its end, in the
+#   order they were played, so it is bitwise
+#   equal to the Tournament's adj at the time.
+#   h[k] is the matrix of round k, h[a:b] and
+#   stack(a,b) the stack of rounds a to b-1, and
+#   chunks(m) yields the stacks of m rounds.
+###############################################
+class RoundHistory:
+    def __init__(self,n):
+        self.n = n
+        self.i = array('i')
+        self.j = array('i')
+        self.s = array('d')
+        self.bounds = array('q',[0])
+    def play(self,i,j,s):
+        self.i.append(int(i))
+        self.j.append(int(j))
+        self.s.append(float(s))
+    def endRound(self):
+        self.bounds.append(len(self.i))
+    def __len__(self):
+        return len(self.bounds) - 1
+    def __getitem__(self,k):
+        if(isinstance(k,slice)):
+            ks = range(*k.indices(len(self)))
+            if(len(ks)==0):
+                return np.zeros((0,self.n,self.n))
+            first = min(ks)
+            return self.stack(first,max(ks)+1)[[k-first for k in ks]]
+        if(k<0):
+            k = k + len(self)
+        if(k<0 or k>=len(self)):
+            raise IndexError('round %d out of range' % k)
+        return self.stack(k,k+1)[0]
+    def __iter__(self):
+        for a in self.chunks(1):
+            yield a[0]
+    def stack(self,start,stop):
+        matches = np.zeros((self.n,self.n))
+        self._replay(matches,0,self.bounds[start])
+        return self._rounds(matches,start,stop)
+    def chunks(self,m):
+        matches = np.zeros((self.n,self.n))
+        for start in range(0,len(self),m):
+            yield self._rounds(matches,start,min(start+m,len(self)))
+    def _rounds(self,matches,start,stop):
+        # rounds start to stop-1, from matches at the end of round start-1
+        adjs = np.zeros((stop-start,self.n,self.n))
+        for k in range(start,stop):
+            self._replay(matches,self.bounds[k],self.bounds[k+1])
+            adjacency(matches,adjs[k-start])
+        return adjs
+    def _replay(self,matches,a,b):
+        # games a to b-1
+        if(b<=a):
+            return
+        replay(matches,np.frombuffer(self.i,dtype=np.int32)[a:b],np.frombuffer(self.j,dtype=np.int32)[a:b],
+               np.frombuffer(self.s)[a:b])
+    @property
+    def nbytes(self):
+        return self.i.itemsize*len(self.i) + self.j.itemsize*len(self.j) + self.s.itemsize*len(self.s) + self.bounds.itemsize*len(self.bounds)
+###############################################
+###             replay and adjacency        ###
+###############################################
+#   replay adds the games in which team i[g]
+#   scored s[g] against team j[g] to matches in
+#   the order Tournament.play does, and
+#   adjacency writes the adjacency matrix of
+#   matches to out, so that together they give
+#   the Tournament's adj bitwise.
+###############################################
+def replay(matches,i,j,s):
+    # each game adds s to (i,j) then 1-s to (j,i)
+    np.add.at(matches,(np.c_[i,j].ravel(),np.c_[j,i].ravel()),np.c_[s,1.-s].ravel())
+    return matches
+def adjacency(matches,out=None):
+    if(out is None):
+        out = np.zeros(matches.shape)
+    total = matches + matches.T
+    np.divide(matches,total,out=out,where=total>0)
+    return out
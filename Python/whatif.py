@@ -0,0 +1,223 @@
+# What-If Module
+#
+# This module evaluates scenarios of a season: results flipped, games dropped,
+# or games played in a different order. Each scenario gives the final
+# rankability, the weighted Elo correlation (as in the summary CSVs), and, for
+# CFB, the Elo predictability of the season as it would have been.
+# A scenario replays the season only from the round of its first changed game;
+# the Elo ratings before that round are shared with the base season, and its
+# matches are replayed from the base's last checkpoint before it. The final
+# adjacency matrices of a batch of scenarios are scored with one stacked
+# eigensolve (equal matrices once), and the batches are spread over a pool of
+# worker processes, each of which receives the base seasons once.
+#
+# Usage: python whatif.py DATASET YEAR [YEAR ...] [--flip M] [--drop M]
+#        [--order START] [--count N] [--workers W]
+import argparse
+from collections import namedtuple
+import numpy as np
+from rankability import specR_batch
+from tournament import replay, adjacency
+from elo import eloUpdate, eloHistory, eloCorr, eloPred
+from sweep import driver, run
+import pipeline
+
+# A scenario of a season: the results of games flip are reversed, games drop
+# are not played, and the games are played in order (a permutation of the
+# games, each taking the round of the game it replaces); game indices are
+# those of the season file
+Scenario = namedtuple('Scenario',['flip','drop','order'],defaults=((),(),None))
+# A base season with the matches before every every-th round (checkpoints, see
+# matches), the Elo ratings after each round and their correlations (see
+# eloCorr), and its Elo constants
+Base = namedtuple('Base',['kind','season','bounds','every','checkpoints','history','corr','K','X','H'])
+###############################################
+###             base                        ###
+###############################################
+#   The Base of a season of a dataset of kind
+#   'cfb' or 'sqfield' read from path, with a
+#   checkpoint of the matches every every
+#   rounds.
+###############################################
+def base(kind,path,K,X,H=0.,every=8):
+    s = pipeline.parse(kind,path)
+    bounds = np.searchsorted(s.rnd,np.arange(s.numRounds+1))
+    checkpoints = np.zeros((s.numRounds//every+1,s.n,s.n))
+    for c in range(1,len(checkpoints)):
+        g = slice(bounds[(c-1)*every],bounds[c*every])
+        checkpoints[c] = replay(checkpoints[c-1].copy(),s.i[g],s.j[g],s.s[g])
+    history = eloHistory(s.i,s.j,s.s,s.rnd,s.numRounds,s.n,K,X)
+    return Base(kind,s,bounds,every,checkpoints,history,eloCorr(history),K,X,H)
+###############################################
+###             matches                     ###
+###############################################
+#   Matches before round k of the Base b, by
+#   replaying the games since the checkpoint
+#   before it (bitwise equal to replaying the
+#   season round by round).
+###############################################
+def matches(b,k):
+    c = k//b.every
+    g = slice(b.bounds[c*b.every],b.bounds[k])
+    return replay(b.checkpoints[c].copy(),b.season.i[g],b.season.j[g],b.season.s[g])
+###############################################
+###             evaluate                    ###
+###############################################
+#   Final rankability, weighted Elo correlation
+#   of type opt, and Elo predictability (nan for
+#   the SinquefieldCup) of each scenario of the
+#   Base b, as arrays. Scenarios are evaluated in
+#   batches of batch on workers processes.
+###############################################
+def evaluate(b,scenarios,opt='SR',workers=None,batch=256):
+    scenarios = list(scenarios)
+    res = run(_batch,[(0,scenarios[k:k+batch],opt) for k in range(0,len(scenarios),batch)],workers,_setBases,([b],))
+    return {key: np.concatenate([r[key] for r in res]) if res else np.zeros(0) for key in ['rankability','elo_corr','elo_pred']}
+# bases of the batches, set once per worker process
+_bases = []
+def _setBases(bases):
+    global _bases
+    _bases = bases
+def _batch(index,scenarios,opt):
+    b = _bases[index]
+    adjs = []; elo_corr = []; elo_pred = []
+    for sc in scenarios:
+        adj,corr,pred = _scenario(b,sc,opt)
+        adjs.append(adj); elo_corr.append(corr); elo_pred.append(pred)
+    # one eigensolve per distinct final adjacency matrix
+    if(adjs):
+        unique,inv = np.unique(np.array(adjs),axis=0,return_inverse=True)
+        rankability = specR_batch(unique)[inv.ravel()]
+    else:
+        rankability = np.zeros(0)
+    return {'rankability': rankability,'elo_corr': np.array(elo_corr),'elo_pred': np.array(elo_pred)}
+def _scenario(b,sc,opt):
+    s = b.season
+    games = s.games; i = s.i; j = s.j; r = s.s
+    numGames = len(i)
+    # games in order, with results flipped
+    order = np.arange(numGames) if sc.order is None else np.asarray(sc.order)
+    flip = np.zeros(numGames,dtype=bool); flip[list(sc.flip)] = True
+    keep = np.ones(numGames,dtype=bool); keep[list(sc.drop)] = False
+    # first changed game and its round; earlier rounds are the base's
+    changed = (order!=np.arange(numGames)) | flip[order] | ~keep[order]
+    g0 = np.argmax(changed) if np.any(changed) else numGames
+    k0 = s.rnd[g0] if g0<numGames else s.numRounds
+    # games kept, taking the days (CFB) or rounds of the games they replace,
+    # split into rounds again as the season file without the dropped games
+    # would be: CFB rounds by the days left, no empty SinquefieldCup rounds.
+    # Rounds before k0 are unchanged
+    g = np.flatnonzero(keep[order])
+    if(b.kind=='cfb'):
+        rnd = pipeline.rounds(games['day'][g])
+    else:
+        rnd = np.r_[0,np.cumsum(np.diff(s.rnd[g])>0)]
+    numRounds = rnd[-1]+1 if len(g) else 0
+    # games from round k0 on
+    m = g>=b.bounds[k0]
+    rnd = rnd[m]; g = order[g[m]]
+    i = i[g]; j = j[g]; r = np.where(flip[g],1.-r[g],r[g])
+    # final adjacency matrix
+    adj = adjacency(replay(matches(b,k0),i,j,r))
+    # Elo ratings from round k0 on
+    history = np.zeros((max(numRounds,k0),s.n))
+    history[:k0] = b.history[:k0]
+    rating = history[k0-1].copy() if k0>0 else np.zeros(s.n)
+    bounds = np.searchsorted(rnd,np.arange(k0,numRounds+1))
+    for k in range(k0,numRounds):
+        m = slice(bounds[k-k0],bounds[k-k0+1])
+        history[k] = eloUpdate(rating,i[m],j[m],r[m],b.K,b.X)
+    # correlations of rounds before k0 are the base's
+    corr = np.r_[b.corr[opt][:max(k0-1,0)],eloCorr(history[max(k0-1,0):],(opt,))[opt]]
+    corr = np.average(corr,weights=[k for k in range(len(corr))])
+    # Elo predictability of the games played, with flipped scores
+    pred = np.nan
+    if(b.kind=='cfb'):
+        g = order[keep[order]]
+        played = games[g].copy()
+        played['scorei'] = np.where(flip[g],games['scorej'][g],games['scorei'][g])
+        played['scorej'] = np.where(flip[g],games['scorei'][g],games['scorej'][g])
+        pred = eloPred(played,history[-1],b.H)
+    return adj, corr, pred
+###############################################
+###             scenario generators         ###
+###############################################
+#   count random scenarios of a Season, with m
+#   results flipped, m games dropped, or the
+#   games from index start on shuffled.
+###############################################
+def randomFlips(season,m,count,rng):
+    return [Scenario(flip=rng.choice(len(season.i),m,replace=False)) for k in range(count)]
+def randomDrops(season,m,count,rng):
+    return [Scenario(drop=rng.choice(len(season.i),m,replace=False)) for k in range(count)]
+def randomOrders(season,count,rng,start=0):
+    n = len(season.i)
+    return [Scenario(order=np.r_[np.arange(start),start+rng.permutation(n-start)]) for k in range(count)]
+###############################################
+###             whatif                      ###
+###############################################
+#   Evaluates the scenarios make(season) of each
+#   year of a dataset (see pipeline.discover) with
+#   the driver's Elo constants, unless given.
+#   All batches of all years share one pool of
+#   workers processes, which receive the bases
+#   once. Returns, by year, the
+#   base season's values and the arrays of the
+#   scenarios (see evaluate).
+###############################################
+def whatif(name,years,make,opt='SR',K=None,X=None,H=None,workers=None,batch=256):
+    d = pipeline.discover()[name]
+    mod = driver('CFB-Rank-EloCorr' if d.kind=='cfb' else 'SQField-Rank-EloCorr')
+    K = mod.K if K is None else K; X = mod.X if X is None else X; H = getattr(mod,'H',0.) if H is None else H
+    bases = []; tasks = []; owner = []
+    for year in years:
+        b = base(d.kind,d.paths[year],K,X,H)
+        bases.append(b)
+        # the unchanged scenario first
+        scenarios = [Scenario()] + list(make(b.season))
+        for k in range(0,len(scenarios),batch):
+            tasks.append((len(bases)-1,scenarios[k:k+batch],opt)); owner.append(year)
+    res = run(_batch,tasks,workers,_setBases,(bases,))
+    out = {}
+    for year in years:
+        r = [q for q,y in zip(res,owner) if y==year]
+        r = {key: np.concatenate([q[key] for q in r]) for key in ['rankability','elo_corr','elo_pred']}
+        out[year] = {'base': {key: v[0] for key,v in r.items()},'scenarios': {key: v[1:] for key,v in r.items()}}
+    return out
+###############################################
+###             main                        ###
+###############################################
+#   Prints the base value and the 5%, 50%, and
+#   95% quantiles of each measure over the
+#   scenarios of each year.
+###############################################
+def main():
+    parser = argparse.ArgumentParser(description='What-if scenarios of seasons.')
+    parser.add_argument('dataset',help='dataset name, e.g. "CFB/Big East" (see python -m specr list)')
+    parser.add_argument('years',type=int,nargs='+')
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--flip',type=int,default=1,help='results flipped per scenario (default 1)')
+    group.add_argument('--drop',type=int,help='games dropped per scenario')
+    group.add_argument('--order',type=int,help='shuffle the games from this index on')
+    parser.add_argument('--count',type=int,default=1000,help='scenarios per year')
+    parser.add_argument('--opt',default='SR',choices=['SR','KT','PR'])
+    parser.add_argument('--workers',type=int)
+    parser.add_argument('--seed',type=int,default=0)
+    args = parser.parse_args()
+    rng = np.random.default_rng(args.seed)
+    if(args.drop is not None):
+        make = lambda s: randomDrops(s,args.drop,args.count,rng)
+    elif(args.order is not None):
+        make = lambda s: randomOrders(s,args.count,rng,args.order)
+    else:
+        make = lambda s: randomFlips(s,args.flip,args.count,rng)
+    res = whatif(args.dataset,args.years,make,args.opt,workers=args.workers)
+    print('Year, Measure, Base, 5%, 50%, 95%')
+    for year,r in res.items():
+        for key in ['rankability','elo_corr','elo_pred']:
+            if(not np.isnan(r['base'][key])):
+                q = np.quantile(r['scenarios'][key],[0.05,0.5,0.95])
+                print('%d,%s,%.4f,%.4f,%.4f,%.4f' % (year,key,r['base'][key],q[0],q[1],q[2]))
+
+if __name__ == '__main__':
+    main()